@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Project Analyser Benchmark
+Times analyse_flutter_project.py on a generated corpus and saves the numbers
+as JSON, so runs from two commits can be compared.
+
+Measures:
+  - analyse_project() end to end (best and median of --repeat runs)
+  - the shared lexer (mask_dart + ScopeIndex) and each check_* rule on its own
+  - peak RSS of a full CLI run
+
+Usage:
+    python bench_analyser.py
+    python bench_analyser.py --files 2000 --lines 400 --output before.json
+    python bench_analyser.py --compare before.json after.json --max-regression 10
+"""
+
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+from statistics import median
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+BENCH_DIR   = Path(__file__).parent
+ROOT_DIR    = BENCH_DIR.parent
+ANALYSER    = ROOT_DIR / "scripts" / "analyse_flutter_project.py"
+RESULTS_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(ANALYSER.parent))
+import analyse_flutter_project as analyser  # noqa: E402
+from generate_corpus import generate, add_arguments, corpus_options  # noqa: E402
+
+
+# ─── Measurements ─────────────────────────────────────────────────────────────
+def corpus_stats(files: list) -> dict:
+    total_bytes = total_lines = 0
+    for f in files:
+        data = f.read_bytes()
+        total_bytes += len(data)
+        total_lines += data.count(b"\n")
+    return {"files": len(files), "lines": total_lines, "bytes": total_bytes}
+
+
+def rates(seconds: float, stats: dict) -> dict:
+    seconds = max(seconds, 1e-9)
+    return {
+        "seconds":     round(seconds, 4),
+        "files_per_s": round(stats["files"] / seconds, 1),
+        "lines_per_s": round(stats["lines"] / seconds, 1),
+    }
+
+
+def time_end_to_end(corpus: Path, repeat: int, jobs: int) -> list:
+    """Wall time of analyse_project() (no cache, report discarded) per run."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyser.analyse_project(str(corpus), jobs=jobs, use_cache=False, output_format="ndjson")
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def time_checks(corpus: Path, files: list) -> dict:
+    """Seconds spent in the lexer and in each rule, over every file.
+
+    Rules share a SourceScan, so each file is lexed (masked code + scopes)
+    once and timed as "lexer"; every rule then runs on a fresh scan holding
+    that lexed state, so the token lookups it triggers are charged to it.
+    """
+    sources = [(str(f.relative_to(corpus)), analyser.read_file(f)) for f in files]
+    rules = analyser.FILE_RULES + analyser.METRIC_RULES
+    totals = {"lexer": 0.0}
+    totals.update((rule.__name__, 0.0) for rule in rules)
+
+    for rel, lines in sources:
+        lexed = analyser.SourceScan(lines)
+        start = time.perf_counter()
+        lexed.code, lexed.scopes
+        totals["lexer"] += time.perf_counter() - start
+        for rule in rules:
+            scan = analyser.SourceScan(lines)
+            scan._code, scan._scopes = lexed._code, lexed._scopes
+            start = time.perf_counter()
+            rule(rel, scan)
+            totals[rule.__name__] += time.perf_counter() - start
+    return totals
+
+
+def peak_rss_mb(corpus: Path, jobs: int):
+    """Peak RSS (MB) of one CLI run in a child process, or None if unknown."""
+    if resource is None:
+        return None
+    subprocess.run(
+        [sys.executable, str(ANALYSER), "--path", str(corpus), "--no-cache",
+         "--jobs", str(jobs), "--format", "ndjson"],
+        stdout=subprocess.DEVNULL, check=True,
+    )
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "-C", str(ROOT_DIR), "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="flutter-bench-") as tmp:
+        corpus = Path(args.corpus) if args.corpus else Path(tmp) / "corpus"
+        params = None if args.corpus else generate(corpus, **corpus_options(args))
+        files = analyser.find_dart_files(corpus)
+        stats = corpus_stats(files)
+
+        runs = time_end_to_end(corpus, args.repeat, args.jobs)
+        checks = time_checks(corpus, files)
+        rss = peak_rss_mb(corpus, args.jobs)
+
+    return {
+        "meta": {
+            "revision":  git_revision(),
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "jobs":      args.jobs,
+            "repeat":    args.repeat,
+            "corpus":    params or str(args.corpus),
+        },
+        "corpus": stats,
+        "end_to_end": {
+            "runs":   [round(r, 4) for r in runs],
+            "best":   rates(min(runs), stats),
+            "median": rates(median(runs), stats),
+        },
+        "checks": {name: rates(seconds, stats) for name, seconds in checks.items()},
+        "peak_rss_mb": rss,
+    }
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+def print_result(result: dict):
+    stats, e2e = result["corpus"], result["end_to_end"]
+    print(f"\nCorpus   : {stats['files']} files, {stats['lines']} lines, {stats['bytes'] / 1e6:.1f} MB")
+    print(f"Revision : {result['meta']['revision']} (Python {result['meta']['python']}, --jobs {result['meta']['jobs']})")
+    print(f"\nEnd to end  best {e2e['best']['seconds']:.3f}s   median {e2e['median']['seconds']:.3f}s")
+    print(f"            {e2e['best']['files_per_s']:.0f} files/s   {e2e['best']['lines_per_s']:.0f} lines/s")
+    print(f"Peak RSS    {result['peak_rss_mb']} MB\n")
+    print(f"{'Stage':<28}{'seconds':>10}{'lines/s':>14}")
+    for name, r in sorted(result["checks"].items(), key=lambda kv: -kv[1]["seconds"]):
+        print(f"{name:<28}{r['seconds']:>10.3f}{r['lines_per_s']:>14.0f}")
+    print()
+
+
+def metrics(result: dict) -> dict:
+    """Lower-is-better numbers compared between two results."""
+    out = {"end_to_end (best s)": result["end_to_end"]["best"]["seconds"]}
+    out.update((f"{name} (s)", r["seconds"]) for name, r in result["checks"].items())
+    if result.get("peak_rss_mb") is not None:
+        out["peak RSS (MB)"] = result["peak_rss_mb"]
+    return out
+
+
+def compare(before_path: str, after_path: str, max_regression: float) -> int:
+    before = json.loads(Path(before_path).read_text(encoding="utf-8"))
+    after  = json.loads(Path(after_path).read_text(encoding="utf-8"))
+    if before["corpus"] != after["corpus"]:
+        print("WARNING: the two results were measured on different corpora.")
+
+    old, new = metrics(before), metrics(after)
+    print(f"\n{'Metric':<34}{before['meta']['revision']:>12}{after['meta']['revision']:>12}{'change':>10}")
+    regressions = []
+    for name in old:
+        if name not in new:
+            continue
+        change = (new[name] - old[name]) / old[name] * 100 if old[name] else 0.0
+        flag = ""
+        if change > max_regression:
+            flag = "  ← regression"
+            regressions.append(name)
+        print(f"{name:<34}{old[name]:>12.3f}{new[name]:>12.3f}{change:>+9.1f}%{flag}")
+    print()
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark analyse_flutter_project.py")
+    parser.add_argument("--corpus", help="Benchmark an existing project instead of generating one")
+    parser.add_argument("--repeat", type=int, default=3, help="End-to-end runs (default 3)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Analyser worker processes (default 1)")
+    parser.add_argument("--output", help="Where to save the JSON result (default benchmarks/results/<revision>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two saved results instead of running")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="With --compare, exit 1 if any metric got this many percent worse (default 10)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.max_regression))
+
+    result = run(args)
+    print_result(result)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{result['meta']['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    print(f"Saved {output}")
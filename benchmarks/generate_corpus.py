@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Synthetic Flutter Corpus Generator
+Writes a deterministic Flutter project for benchmarking the project analyser.
+
+The same arguments (and --seed) always produce byte-identical files, so two
+commits can be timed against exactly the same input.
+
+Usage:
+    python generate_corpus.py --output /tmp/corpus
+    python generate_corpus.py --output /tmp/corpus --files 2000 --lines 400
+    python generate_corpus.py --output /tmp/corpus --colors 4 --long-builds 0.3
+"""
+
+import random
+import shutil
+import argparse
+from pathlib import Path
+
+# ─── Defaults ─────────────────────────────────────────────────────────────────
+# Densities are "per 100 generated lines" so they scale with --lines.
+DEFAULTS = {
+    "files":       500,    # Dart files under lib/
+    "lines":       250,    # approximate lines per file
+    "colors":      1.0,    # Color(0x...) literals per 100 lines
+    "listviews":   0.3,    # ListView( children: ...) per 100 lines
+    "async":       0.5,    # await ... context pairs per 100 lines
+    "long_builds": 0.15,   # fraction of widgets with a build() over 100 lines
+    "seed":        1,
+}
+
+PUBSPEC = """name: bench_corpus
+description: Synthetic project generated by benchmarks/generate_corpus.py
+publish_to: none
+environment:
+  sdk: ">=3.3.0 <4.0.0"
+dependencies:
+  flutter:
+    sdk: flutter
+"""
+
+WIDGETS = ["Text('{w}')", "const SizedBox(height: 8)", "Icon(Icons.star)",
+           "Padding(padding: const EdgeInsets.all(8), child: Text('{w}'))",
+           "Row(children: [Text('{w}'), const Spacer()])"]
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+
+# ─── Generator ────────────────────────────────────────────────────────────────
+class DartFileWriter:
+    """Builds one file out of widget classes until it reaches its line budget."""
+
+    def __init__(self, rng: random.Random, index: int, params: dict):
+        self.rng    = rng
+        self.index  = index
+        self.params = params
+        self.lines  = ["import 'package:flutter/material.dart';", ""]
+
+    def chance(self, per_100_lines: float) -> bool:
+        return self.rng.random() < per_100_lines / 100
+
+    def child(self) -> str:
+        if self.chance(self.params["colors"] * 4):
+            return f"Container(color: const Color(0xFF{self.rng.randrange(1 << 24):06X}))"
+        if self.chance(self.params["listviews"] * 4):
+            return f"ListView(children: [Text('{self.rng.choice(WORDS)}')])"
+        return self.rng.choice(WIDGETS).format(w=self.rng.choice(WORDS))
+
+    def widget(self, n: int):
+        name = f"Widget{self.index}x{n}"
+        stateful = self.rng.random() < 0.3
+        long_build = self.rng.random() < self.params["long_builds"]
+        children = self.rng.randint(105, 140) if long_build else self.rng.randint(5, 30)
+
+        if stateful:
+            self.lines += [
+                f"class {name} extends StatefulWidget {{",
+                f"  const {name}({{super.key}});",
+                "  @override",
+                f"  State<{name}> createState() => _{name}State();",
+                "}",
+                "",
+                f"class _{name}State extends State<{name}> {{",
+                "  int _count = 0;",
+                "",
+            ]
+            self.async_method()
+        else:
+            self.lines += [
+                f"class {name} extends StatelessWidget {{",
+                f"  const {name}({{super.key}});",
+                "",
+            ]
+        self.lines += [
+            "  @override",
+            "  Widget build(BuildContext context) {",
+            "    // Layout for " + self.rng.choice(WORDS) + " { not a brace }",
+            "    return Column(",
+            "      children: [",
+        ]
+        self.lines += [f"        {self.child()}," for _ in range(children)]
+        if stateful:
+            self.lines.append("        TextButton(onPressed: () => setState(() => _count++), child: Text('$_count')),")
+        self.lines += ["      ],", "    );", "  }", "}", ""]
+
+    def async_method(self):
+        self.lines += ["  Future<void> _load() async {"]
+        for _ in range(max(1, round(self.params["async"] * self.params["lines"] / 100))):
+            self.lines.append(f"    await Future<void>.delayed(const Duration(milliseconds: {self.rng.randint(1, 99)}));")
+            guard = self.rng.random()
+            if guard < 0.25:
+                self.lines.append("    if (!mounted) return;")
+            elif guard < 0.5:
+                self.lines.append("    if (!context.mounted) return;")
+            self.lines.append("    ScaffoldMessenger.of(context).showSnackBar(const SnackBar(content: Text('done')));")
+        self.lines += ["  }", ""]
+
+    def render(self) -> str:
+        n = 0
+        while len(self.lines) < self.params["lines"]:
+            self.widget(n)
+            n += 1
+        return "\n".join(self.lines) + "\n"
+
+
+def generate(output: Path, **overrides) -> dict:
+    """Write a corpus to `output` (replacing it) and return its parameters."""
+    params = dict(DEFAULTS, **{k: v for k, v in overrides.items() if v is not None})
+    rng = random.Random(params["seed"])
+    if output.exists():
+        shutil.rmtree(output)
+    (output / "lib").mkdir(parents=True)
+    (output / "pubspec.yaml").write_text(PUBSPEC, encoding="utf-8")
+    for i in range(params["files"]):
+        folder = output / "lib" / "features" / f"feature_{i // 50:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"screen_{i:05d}.dart").write_text(DartFileWriter(rng, i, params).render(), encoding="utf-8")
+    return params
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--files", type=int, help=f"Number of Dart files (default {DEFAULTS['files']})")
+    parser.add_argument("--lines", type=int, help=f"Approximate lines per file (default {DEFAULTS['lines']})")
+    parser.add_argument("--colors", type=float, help="Color(0x...) literals per 100 lines")
+    parser.add_argument("--listviews", type=float, help="ListView(children:) per 100 lines")
+    parser.add_argument("--async", dest="async_", type=float, help="await/context pairs per 100 lines")
+    parser.add_argument("--long-builds", type=float, help="Fraction of widgets with a build() over 100 lines")
+    parser.add_argument("--seed", type=int, help="Random seed (default 1)")
+
+
+def corpus_options(args: argparse.Namespace) -> dict:
+    return {"files": args.files, "lines": args.lines, "colors": args.colors,
+            "listviews": args.listviews, "async": args.async_,
+            "long_builds": args.long_builds, "seed": args.seed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Flutter project for benchmarks")
+    parser.add_argument("--output", required=True, help="Directory to (re)create")
+    add_arguments(parser)
+    args = parser.parse_args()
+    params = generate(Path(args.output), **corpus_options(args))
+    print(f"Generated {params['files']} files under {args.output}/lib")
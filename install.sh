@@ -104,6 +104,7 @@ install_skill() {
   # Scripts
   download_file "$target_dir/scripts/analyse_flutter_project.py" "scripts/analyse_flutter_project.py"
   download_file "$target_dir/scripts/search_guidelines.py" "scripts/search_guidelines.py"
+  download_file "$target_dir/scripts/knowledge_base.py" "scripts/knowledge_base.py"
   download_file "$target_dir/scripts/create_flutter_project.py" "scripts/create_flutter_project.py"
 
   # Templates
@@ -116,7 +117,7 @@ install_skill() {
 
   printf "\n✅ Installation complete!\n"
   printf "   Location : %s\n" "$target_dir"
-  printf "   Files    : SKILL.md + 5 CSVs + 3 scripts + 3 templates\n\n"
+  printf "   Files    : SKILL.md + 5 CSVs + 4 scripts + 3 templates\n\n"
 }
 
 # ── Run ────────────────────────────────────────────────────────
@@ -7,15 +7,45 @@ Usage:
     python analyse_flutter_project.py --path /path/to/flutter/project
     python analyse_flutter_project.py --path /path/to/flutter/project --fix-suggestions
     python analyse_flutter_project.py --path /path/to/flutter/project --json
+    python analyse_flutter_project.py --path /path/to/flutter/project --jobs 8
+    python analyse_flutter_project.py --path /path/to/flutter/project --format sarif > audit.sarif
+    python analyse_flutter_project.py --path /path/to/monorepo --workspace
+    python analyse_flutter_project.py --path /path/to/flutter/project --watch
+    python analyse_flutter_project.py --path /path/to/flutter/project --changed-since origin/main --hunks-only
+    python analyse_flutter_project.py --path /path/to/flutter/project --profile --no-cache
+    python analyse_flutter_project.py --path /path/to/flutter/project --duplicates 60
+    python analyse_flutter_project.py --path /path/to/flutter/project --save-baseline
+    python analyse_flutter_project.py --path /path/to/flutter/project --baseline --format sarif
+    python analyse_flutter_project.py --path /path/to/flutter/project --from-store --severity critical
 """
 
 import os
 import re
+import codecs
 import sys
+import math
 import json
+import time
+import select
+import struct
+import mmap
+import heapq
+import hashlib
+import posixpath
+import sqlite3
 import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial, lru_cache
+from itertools import islice
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Set, Tuple, Optional
+
+import knowledge_base
 
 
 # ─── ANSI Colors ──────────────────────────────────────────────────────────────
@@ -35,15 +65,22 @@ def cyan(s: str) -> str:  return f"{CYAN}{s}{RESET}"
 
 
 # ─── Issue Model ──────────────────────────────────────────────────────────────
+SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+
 class Issue:
+    __slots__ = ("severity", "category", "file", "line", "message", "suggestion", "rule")
+
     def __init__(self, severity: str, category: str, file: str,
-                 line: Optional[int], message: str, suggestion: str):
+                 line: Optional[int], message: str, suggestion: str,
+                 rule: Optional[str] = None):
         self.severity   = severity  # CRITICAL / HIGH / MEDIUM / LOW
         self.category   = category
         self.file       = file
         self.line       = line
         self.message    = message
         self.suggestion = suggestion
+        self.rule       = rule      # id of the check that raised it (SARIF ruleId)
 
     def __repr__(self):
         loc = f":{self.line}" if self.line else ""
@@ -67,305 +104,3532 @@ class Issue:
         }
 
 
+class IssueStore:
+    """All of a run's issues as integer columns over one interned string table.
+
+    A project with a million Color(0x...) hits holds a million rows of small
+    ints (file, category, message, suggestion, rule and severity ids, plus
+    the line), not a million Issue objects each pointing at its own copy of
+    the path. Issue objects and dicts are only rebuilt one at a time when a
+    report is written.
+    """
+    NO_LINE = 0    # lines are 1-based; 0 stands for "whole file"
+    NO_RULE = -1
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.severity   = array("l")
+        self.file       = array("l")
+        self.line       = array("l")
+        self.category   = array("l")
+        self.message    = array("l")
+        self.suggestion = array("l")
+        self.rule       = array("l")
+
+    def _id(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            i = self._ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def extend(self, issues: List[Issue]):
+        intern = self._id
+        for issue in issues:
+            self.severity.append(intern(issue.severity))
+            self.file.append(intern(issue.file))
+            self.line.append(issue.line or self.NO_LINE)
+            self.category.append(intern(issue.category))
+            self.message.append(intern(issue.message))
+            self.suggestion.append(intern(issue.suggestion))
+            self.rule.append(self.NO_RULE if issue.rule is None else intern(issue.rule))
+
+    def __len__(self) -> int:
+        return len(self.severity)
+
+    def counts(self) -> Dict[str, int]:
+        """Issues per severity, counted over the id column."""
+        counts = dict.fromkeys(SEVERITIES, 0)
+        for sev_id, n in Counter(self.severity).items():
+            counts[self.strings[sev_id]] = n
+        return counts
+
+    def by_severity(self) -> List[int]:
+        """Row numbers, CRITICAL first, keeping insertion order within a
+        severity (a stable counting sort)."""
+        rank = {self._ids[sev]: r for r, sev in enumerate(SEVERITIES) if sev in self._ids}
+        buckets: List[List[int]] = [[] for _ in range(len(SEVERITIES) + 1)]
+        unknown = len(SEVERITIES)
+        for row, sev_id in enumerate(self.severity):
+            buckets[rank.get(sev_id, unknown)].append(row)
+        return [row for bucket in buckets for row in bucket]
+
+    def issue(self, row: int) -> Issue:
+        s = self.strings
+        rule = self.rule[row]
+        return Issue(s[self.severity[row]], s[self.category[row]], s[self.file[row]],
+                     self.line[row] or None, s[self.message[row]], s[self.suggestion[row]],
+                     None if rule == self.NO_RULE else s[rule])
+
+    def to_dict(self, row: int) -> dict:
+        return self.issue(row).to_dict()
+
+
 # ─── File Scanner ─────────────────────────────────────────────────────────────
-def find_dart_files(project_path: Path) -> List[Path]:
-    """Find all .dart files under lib/."""
+# build_runner / mockito output: skipped unless --include-generated.
+GENERATED_SUFFIXES = (".g.dart", ".freezed.dart", ".mocks.dart")
+
+
+def _dart_sources(filenames: List[str], include_generated: bool) -> List[str]:
+    return [f for f in filenames
+            if f.endswith(".dart") and (include_generated or not f.endswith(GENERATED_SUFFIXES))]
+
+
+def find_dart_files(project_path: Path, include_generated: bool = False) -> List[Path]:
+    """Find all .dart files under lib/, in a stable (sorted) order."""
     lib_path = project_path / "lib"
     if not lib_path.exists():
         print(red(f"ERROR: No 'lib/' directory found at {project_path}"))
+        print("  For a workspace / monorepo root, run with --workspace.")
+        sys.exit(1)
+    files = []
+    for dirpath, _, filenames in os.walk(lib_path):
+        files.extend(Path(dirpath) / f for f in _dart_sources(filenames, include_generated))
+    return sorted(files)
+
+
+def _pruned(here: Path, dirnames: List[str], is_package: bool) -> List[str]:
+    """The subdirectories of `here` a workspace walk should enter."""
+    return [
+        d for d in dirnames
+        if not d.startswith(".")
+        and not (is_package and d == "build")
+        and not (d == "Pods" and here.name in ("ios", "macos"))
+    ]
+
+
+def find_workspace(root: Path, include_generated: bool = False) -> Tuple[List[Path], List[Path]]:
+    """(package roots, .dart files under their lib/) below a workspace root.
+
+    A package is any directory holding a pubspec.yaml. The tree is walked
+    once; hidden directories (.dart_tool, .git, ios/.symlinks, ...), each
+    package's build/ output and CocoaPods checkouts are pruned before they
+    are entered.
+    """
+    packages: List[Path] = []
+    files: List[Path] = []
+    in_lib = set()    # lib/ directories (and their subdirectories) of packages
+    for dirpath, dirnames, filenames in os.walk(root):
+        here = Path(dirpath)
+        is_package = "pubspec.yaml" in filenames
+        if is_package:
+            packages.append(here)
+            in_lib.add(here / "lib")
+        dirnames[:] = _pruned(here, dirnames, is_package)
+        if here in in_lib or here.parent in in_lib:
+            in_lib.add(here)
+            files.extend(here / f for f in _dart_sources(filenames, include_generated))
+    if not packages:
+        print(red(f"ERROR: No pubspec.yaml found under {root}"))
         sys.exit(1)
-    return list(lib_path.rglob("*.dart"))
+    return sorted(packages), sorted(files)
+
+
+def decode_lines(data: bytes) -> List[str]:
+    try:
+        return data.decode("utf-8").splitlines()
+    except UnicodeDecodeError:
+        return []
 
 
 def read_file(path: Path) -> List[str]:
     try:
-        return path.read_text(encoding="utf-8").splitlines()
-    except Exception:
+        return decode_lines(path.read_bytes())
+    except OSError:
         return []
 
 
+# ─── Dart Lexer ───────────────────────────────────────────────────────────────
+# The rules never look at raw source. mask_dart() blanks comments and the
+# contents of string literals (keeping offsets and newlines, so line numbers
+# are unchanged) and ScopeIndex maps the remaining code to class, function
+# and closure spans. Both jump between delimiters with compiled regexes
+# rather than walking the file character by character.
+# Every branch starts with a literal so `re` can skip to candidate offsets; a
+# raw string's 'r' prefix is checked by hand once its quote is found.
+_CODE_RE   = re.compile(r"//|/\*|'''|\"\"\"|'|\"")
+_INTERP_RE = re.compile(r"//|/\*|'''|\"\"\"|'|\"|[{}]")
+_BLOCK_COMMENT_RE = re.compile(r'/\*|\*/')
+# Where the contents of each kind of (non-raw) string literal may stop.
+_STRING_STOP_RE = {
+    "'":      re.compile(r"\\[\s\S]|\$\{|\$[A-Za-z_]\w*|'|\n"),
+    '"':      re.compile(r'\\[\s\S]|\$\{|\$[A-Za-z_]\w*|"|\n'),
+    "'''":    re.compile(r"\\[\s\S]|\$\{|\$[A-Za-z_]\w*|'''"),
+    '"""':    re.compile(r'\\[\s\S]|\$\{|\$[A-Za-z_]\w*|"""'),
+}
+_RAW_STRING_END_RE = {
+    "'": re.compile(r"'|\n"), '"': re.compile(r'"|\n'),
+    "'''": re.compile(r"'''"), '"""': re.compile(r'"""'),
+}
+_NOT_NEWLINE_RE = re.compile(r'[^\n]')
+
+
+def _lex_code(text: str, pos: int, masked: List[Tuple[int, int]], interpolation: bool) -> int:
+    """Record comment/string spans from `pos`; returns where the code ends.
+
+    Inside a ${...} interpolation the code ends at the unmatched '}'.
+    """
+    pattern = _INTERP_RE if interpolation else _CODE_RE
+    depth = 0
+    while True:
+        m = pattern.search(text, pos)
+        if m is None:
+            return len(text)
+        tok, start = m.group(), m.start()
+        if tok == '{':
+            depth += 1
+            pos = m.end()
+        elif tok == '}':
+            if depth == 0:
+                return start
+            depth -= 1
+            pos = m.end()
+        elif tok == '//':
+            end = text.find('\n', start)
+            pos = len(text) if end == -1 else end
+            masked.append((start, pos))
+        elif tok == '/*':
+            depth_c = 0
+            pos = len(text)
+            for c in _BLOCK_COMMENT_RE.finditer(text, start):
+                depth_c += 1 if c.group() == '/*' else -1
+                if depth_c == 0:
+                    pos = c.end()
+                    break
+            masked.append((start, pos))
+        else:
+            raw = start > 0 and text[start - 1] == 'r' and not (start > 1 and _is_word_char(text[start - 2]))
+            pos = _lex_string(text, m.end(), tok, raw, masked)
+
+
+def _lex_string(text: str, pos: int, quote: str, raw: bool, masked: List[Tuple[int, int]]) -> int:
+    """Mask a string literal's contents, keeping its quotes and any interpolated code."""
+    content = pos
+    if raw:
+        m = _RAW_STRING_END_RE[quote].search(text, pos)
+        end = m.start() if m else len(text)
+        masked.append((content, end))
+        return m.end() if m and m.group() != '\n' else end
+
+    stop = _STRING_STOP_RE[quote]
+    while True:
+        m = stop.search(text, pos)
+        if m is None:
+            masked.append((content, len(text)))
+            return len(text)
+        tok = m.group()
+        if tok == quote or tok == '\n':
+            # '\n' only stops single-line strings: an unterminated literal.
+            masked.append((content, m.start()))
+            return m.end() if tok == quote else m.start()
+        if tok == '${':
+            masked.append((content, m.end()))
+            close = _lex_code(text, m.end(), masked, interpolation=True)
+            content, pos = close, close + 1
+        elif tok[0] == '$':
+            # $name interpolation: the identifier is real code.
+            masked.append((content, m.start() + 1))
+            content = pos = m.end()
+        else:
+            pos = m.end()
+
+
+def mask_dart(text: str) -> str:
+    """`text` with comments and string contents replaced by spaces."""
+    masked: List[Tuple[int, int]] = []
+    _lex_code(text, 0, masked, interpolation=False)
+    if not masked:
+        return text
+    parts = []
+    last = 0
+    for start, end in masked:
+        if start >= end:
+            continue
+        parts.append(text[last:start])
+        seg = text[start:end]
+        parts.append(_NOT_NEWLINE_RE.sub(' ', seg) if '\n' in seg else ' ' * (end - start))
+        last = end
+    parts.append(text[last:])
+    return ''.join(parts)
+
+
+class Scope:
+    """A class body, function body or closure in a masked Dart file.
+
+    `head` is where the declaration starts (the name, or '(' for closures),
+    `start`/`end` bound the body: '{'..'}' inclusive, or '=>' up to the end
+    of the arrow expression.
+    """
+    __slots__ = ("kind", "name", "head", "start", "end", "parent", "is_build")
+
+    def __init__(self, kind: str, name: str, head: int, start: int, parent: Optional["Scope"]):
+        self.kind     = kind      # class / function / closure / block
+        self.name     = name
+        self.head     = head
+        self.start    = start
+        self.end      = start
+        self.parent   = parent
+        self.is_build = False
+
+    def __contains__(self, offset: int) -> bool:
+        return self.start <= offset < self.end
+
+
+_STRUCTURE_RE  = re.compile(r'\{|\}|=>')
+_ARROW_END_RE  = re.compile(r'[()\[\]{};,]')
+_CLASS_HEAD_RE = re.compile(r'(?:class|mixin|enum|extension(?:\s+type)?)\s*([\w$]*)')
+_CLASS_WORDS   = ("class", "mixin", "enum", "extension")
+_GETTER_RE     = re.compile(r'(?<![\w$])get\s+([A-Za-z_$][\w$]*)$')
+_BUILD_TYPE_RE = re.compile(r'Widget\s+$')
+_BODY_MODIFIERS = ("async*", "async", "sync*")
+_CONTROL_WORDS  = {"if", "for", "while", "switch", "catch", "on", "return", "await",
+                   "assert", "super", "this", "new", "const", "throw", "yield"}
+
+
+class ScopeIndex:
+    """Class, method and closure spans of one file, from its masked code."""
+
+    def __init__(self, code: str):
+        self.code = code
+        self.scopes: List[Scope] = []
+        self._build()
+        self._starts = [s.start for s in self.scopes]
+
+    def _build(self):
+        code = self.code
+        # Innermost last. A '{' scope stays open (end == start) until its '}';
+        # an arrow body is pushed with its end already known.
+        stack: List[Scope] = []
+        boundary = 0                 # just after the last '{' or '}'
+        for m in _STRUCTURE_RE.finditer(code):
+            pos = m.start()
+            while stack and stack[-1].start < stack[-1].end <= pos:
+                stack.pop()          # arrow bodies that ended before here
+            tok = m.group()
+            if tok == '}':
+                while stack and stack[-1].end > stack[-1].start:
+                    stack.pop()      # unbalanced arrow body: ends here at the latest
+                if stack:
+                    stack.pop().end = pos + 1
+                boundary = pos + 1
+                continue
+            parent = stack[-1] if stack else None
+
+            kind, name, head = self._classify(code, boundary, pos)
+            if tok == '=>':
+                if kind not in ("function", "closure"):
+                    continue         # switch-expression arms, not a body
+                scope = Scope(kind, name, head, pos, parent)
+                scope.end = self.expression_end(pos + 2)
+            else:
+                scope = Scope(kind, name, head, pos, parent)
+                boundary = pos + 1
+            if kind == "function" and name == "build":
+                scope.is_build = bool(_BUILD_TYPE_RE.search(code, max(0, head - 40), head))
+            self.scopes.append(scope)
+            stack.append(scope)
+        for scope in stack:
+            if scope.end == scope.start:
+                scope.end = len(code)    # unbalanced: runs to end of file
+
+    @staticmethod
+    def _classify(code: str, floor: int, pos: int) -> Tuple[str, str, int]:
+        """What the '{' or '=>' at `pos` opens: (kind, name, head offset)."""
+        j = pos
+        while j > floor and code[j - 1].isspace():
+            j -= 1
+        if j > floor and code[j - 1] in 'c*':
+            for modifier in _BODY_MODIFIERS:
+                k = j - len(modifier)
+                if k > floor and code.startswith(modifier, k) and not _is_word_char(code[k - 1]):
+                    j = k
+                    while j > floor and code[j - 1].isspace():
+                        j -= 1
+                    break
+        last = code[j - 1] if j > floor else ''
+        if last == ')':
+            open_paren = _matching_open_paren(code, j - 1, floor)
+            if open_paren >= 0:
+                name, head = _word_before(code, open_paren, floor)
+                if not name:
+                    return "closure", "", open_paren
+                if name in _CONTROL_WORDS:
+                    return "block", name, head
+                return "function", name, head
+        elif last and (_is_word_char(last) or last == '>'):
+            # Getters and class-like declarations end in a name or type args;
+            # '{' after '(' ',' ':' '=' etc. is a collection literal or block.
+            m = _GETTER_RE.search(code, max(floor, j - 120), j)
+            if m:
+                return "function", m.group(1), m.start(1)
+            for word in _CLASS_WORDS:
+                k = code.find(word, floor, j)
+                while k >= 0 and ((k > 0 and _is_word_char(code[k - 1]))
+                                  or _is_word_char(code[k + len(word):k + len(word) + 1] or ' ')):
+                    k = code.find(word, k + 1, j)
+                if k >= 0:
+                    m = _CLASS_HEAD_RE.match(code, k, j)
+                    return "class", m.group(1) if m else "", k
+        return "block", "", pos
+
+    def expression_end(self, pos: int) -> int:
+        """Where the expression starting at `pos` ends: the first ';' or ','
+        outside brackets, or the bracket that closes around it."""
+        code = self.code
+        depth = 0
+        for m in _ARROW_END_RE.finditer(code, pos):
+            ch = m.group()
+            if ch in '([{':
+                depth += 1
+            elif ch in ')]}':
+                if depth == 0:
+                    return m.start()
+                depth -= 1
+            elif depth == 0:
+                return m.start()
+        return len(code)
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number of a code offset."""
+        return self.code.count('\n', 0, offset) + 1
+
+    def builds(self) -> List[Scope]:
+        return [s for s in self.scopes if s.is_build]
+
+    def function_at(self, offset: int) -> Optional[Scope]:
+        """Innermost function or closure whose body contains `offset`."""
+        scope = self.innermost(offset)
+        while scope is not None and scope.kind not in ("function", "closure"):
+            scope = scope.parent
+        return scope
+
+    def innermost(self, offset: int) -> Optional[Scope]:
+        # Scopes are in start order and nest, so the innermost container is
+        # the last one that starts before `offset` or one of its parents.
+        i = bisect_right(self._starts, offset) - 1
+        scope = self.scopes[i] if i >= 0 else None
+        while scope is not None and offset not in scope:
+            scope = scope.parent
+        return scope
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_$"
+
+
+def _word_before(code: str, pos: int, floor: int) -> Tuple[str, int]:
+    """The identifier (skipping whitespace and <type args>) ending before `pos`."""
+    j = pos
+    while j > floor and code[j - 1].isspace():
+        j -= 1
+    if j > floor and code[j - 1] == '>':
+        lt = code.rfind('<', floor, j)
+        if lt < 0:
+            return "", pos
+        j = lt
+        while j > floor and code[j - 1].isspace():
+            j -= 1
+    end = j
+    while j > floor and _is_word_char(code[j - 1]):
+        j -= 1
+    if j == end or code[j].isdigit():
+        return "", pos
+    return code[j:end], j
+
+
+def _matching_open_paren(code: str, close: int, floor: int) -> int:
+    """Offset of the '(' matching the ')' at `close`, or -1 before `floor`."""
+    depth = 0
+    i = close
+    while True:
+        i = max(code.rfind('(', floor, i), code.rfind(')', floor, i))
+        if i < 0:
+            return -1
+        if code[i] == ')':
+            depth += 1
+        elif depth == 0:
+            return i
+        else:
+            depth -= 1
+
+
+_BRACKET_RE = re.compile(r'[()\[\]{}]')
+_OPEN_OR_COMMA_RE = re.compile(r'[(\[{,]')
+_ARG_NAME_RE = re.compile(r'\s*([A-Za-z_$][\w$]*)\s*:(?!:)')
+
+
+_AS_PARENS = str.maketrans("[{]}", "(())")
+
+
+def bracket_pairs(code: str) -> Dict[int, int]:
+    """Offset of every opening bracket -> offset of its closing bracket
+    (len(code) for brackets left open)."""
+    # With every bracket mapped to '(' / ')', the next opener and closer are
+    # each one str.find away, which beats stepping through a regex.
+    parens = code.translate(_AS_PARENS)
+    find = parens.find
+    pairs: Dict[int, int] = {}
+    stack: List[int] = []
+    opener, closer = find('('), find(')')
+    while opener != -1 or closer != -1:
+        if closer == -1 or opener != -1 and opener < closer:
+            stack.append(opener)
+            opener = find('(', opener + 1)
+        else:
+            if stack:
+                pairs[stack.pop()] = closer
+            closer = find(')', closer + 1)
+    for pos in stack:
+        pairs[pos] = len(code)
+    return pairs
+
+
+def _split_top_level(code: str, pairs: Dict[int, int], start: int, end: int) -> List[Tuple[int, int]]:
+    """Spans of the comma-separated items between `start` and `end`, jumping
+    over nested brackets; the empty item after a trailing comma is dropped."""
+    items = []
+    item = pos = start
+    while True:
+        m = _OPEN_OR_COMMA_RE.search(code, pos, end)
+        if m is None:
+            break
+        if m.group() == ',':
+            items.append((item, m.start()))
+            item = pos = m.end()
+        else:
+            pos = pairs.get(m.start(), end) + 1
+    if item < end and not code[item:end].isspace():
+        items.append((item, end))
+    return items
+
+
+def _named_args(code: str, pairs: Dict[int, int], open_paren: int) -> Dict[str, Tuple[int, int]]:
+    """Named arguments of the call whose '(' is at `open_paren`: name -> value span."""
+    args = {}
+    for start, end in _split_top_level(code, pairs, open_paren + 1, pairs.get(open_paren, len(code))):
+        m = _ARG_NAME_RE.match(code, start, end)
+        if m:
+            args[m.group(1)] = (m.end(), end)
+    return args
+
+
+def _callee(code: str, open_paren: int, floor: int) -> str:
+    """What the '(' at `open_paren` calls: "Column", "ListView.builder", or ""."""
+    name, head = _word_before(code, open_paren, floor)
+    if name and head > floor and code[head - 1] == '.':
+        qualifier, _ = _word_before(code, head - 1, floor)
+        if qualifier:
+            return f"{qualifier}.{name}"
+    return name
+
+
+def _enclosing_calls(code: str, offset: int, floor: int) -> List[Tuple[int, str]]:
+    """(open paren, callee) of every call whose arguments hold `offset`,
+    innermost first, looking no further back than `floor`."""
+    calls = []
+    depth = 0
+    for m in reversed(list(_BRACKET_RE.finditer(code, floor, offset))):
+        ch = m.group()
+        if ch in ')]}':
+            depth += 1
+        elif depth:
+            depth -= 1
+        elif ch == '(':
+            name = _callee(code, m.start(), floor)
+            if name:
+                calls.append((m.start(), name))
+    return calls
+
+
+# ─── Rule Engine ──────────────────────────────────────────────────────────────
+# Every trigger the per-file checks look for, as (anchor literal, pattern).
+# The anchor is located with str.find, which runs at memchr speed, and the
+# pattern (if any) is only tried at anchor hits. This beats one fused regex
+# alternation: most triggers start with common lowercase letters, so `re`
+# would have to try the alternation at nearly every offset of the file.
+TOKENS: Dict[str, Tuple[str, Optional[re.Pattern]]] = {
+    "color":         ("Color(0x", re.compile(r'Color\(0x[0-9A-Fa-f]{6,8}\)')),
+    "listview":      ("ListView", re.compile(r'ListView\s*\(')),
+    "network":       ("Image.network(", None),
+    "asset":         ("Image.asset(", None),
+    "setstate":      ("setState", re.compile(r'setState\s*\(')),
+    "await":         ("await ", None),
+    "context":       ("context", re.compile(r'(?<![\w$])context(?![\w$])')),
+    "mounted":       ("mounted", re.compile(r'(?<![\w$])mounted(?![\w$])')),
+    "const":         ("const", re.compile(r'(?<![\w$])const(?![\w$])')),
+    "stateful":      ("extends", re.compile(r'extends\s+StatefulWidget')),
+    "stateless":     ("extends", re.compile(r'extends\s+StatelessWidget')),
+    "opacity":       ("Opacity", re.compile(r'(?<![\w$])Opacity\s*\(')),
+    "cliprrect":     ("ClipRRect", re.compile(r'(?<![\w$])ClipRRect\s*\(')),
+    "backdrop":      ("BackdropFilter", re.compile(r'(?<![\w$])BackdropFilter\s*\(')),
+    "shadermask":    ("ShaderMask", re.compile(r'(?<![\w$])ShaderMask\s*\(')),
+    "mediaquery":    ("MediaQuery.of", re.compile(r'(?<![\w$])MediaQuery\.of\s*\(')),
+    "column":        ("Column", re.compile(r'(?<![\w$])Column\s*\(')),
+    "gridview":      ("GridView", re.compile(r'(?<![\w$])GridView(?:\.(?:count|extent))?\s*\(')),
+    "cachednetwork": ("CachedNetworkImage", re.compile(r'(?<![\w$])CachedNetworkImage\s*\(')),
+    "shrinkwrap":    ("shrinkWrap", re.compile(r'shrinkWrap\s*:\s*true(?![\w$])')),
+    "duration":      ("Duration", re.compile(r'(?<![\w$])Duration\s*\(')),
+    "animbuilder":   ("AnimatedBuilder", re.compile(r'(?<![\w$])AnimatedBuilder\s*\(')),
+    "tweenbuilder":  ("TweenAnimationBuilder", re.compile(r'(?<![\w$])TweenAnimationBuilder\s*(?:<[^;{}()]*>\s*)?\(')),
+    "addlistener":   ("addListener", re.compile(r'addListener\s*\(')),
+}
+
+
+class SourceScan:
+    """Token and scope index for one file.
+
+    Tokens are matched against the masked code (see mask_dart), so nothing in
+    a comment or string literal can trigger a rule. The masking, the scope
+    index and each token kind are computed the first time a rule asks for
+    them and memoised, so work no rule reaches is never done and rules that
+    share a kind share its hits.
+    """
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.text = '\n'.join(lines)
+        self._code: Optional[str] = None
+        self._scopes: Optional[ScopeIndex] = None
+        self._pairs: Optional[Dict[int, int]] = None
+        self._hits: Dict[str, List[int]] = {}
+        self._offsets: Dict[str, List[int]] = {}
+
+    @property
+    def code(self) -> str:
+        if self._code is None:
+            self._code = mask_dart(self.text)
+        return self._code
+
+    @property
+    def scopes(self) -> ScopeIndex:
+        if self._scopes is None:
+            self._scopes = ScopeIndex(self.code)
+        return self._scopes
+
+    @property
+    def pairs(self) -> Dict[int, int]:
+        """Matching bracket offsets (see bracket_pairs)."""
+        if self._pairs is None:
+            self._pairs = bracket_pairs(self.code)
+        return self._pairs
+
+    def _scan(self, kind: str):
+        anchor, pattern = TOKENS[kind]
+        code = self.code
+        found: List[int] = []
+        offsets: List[int] = []
+        line_no = 1
+        last = 0
+        pos = code.find(anchor)
+        while pos != -1:
+            end = pos + 1
+            m = pattern.match(code, pos) if pattern else None
+            if pattern is None or m:
+                if m:
+                    end = m.end()
+                line_no += code.count('\n', last, pos)
+                last = pos
+                found.append(line_no)
+                offsets.append(pos)
+            pos = code.find(anchor, end)
+        self._hits[kind] = found
+        self._offsets[kind] = offsets
+
+    def hits(self, kind: str) -> List[int]:
+        """Line number of every `kind` hit, in file order."""
+        if kind not in self._hits:
+            self._scan(kind)
+        return self._hits[kind]
+
+    def offsets(self, kind: str) -> List[int]:
+        """Code offset of every `kind` hit, parallel to hits()."""
+        if kind not in self._offsets:
+            self._scan(kind)
+        return self._offsets[kind]
+
+    def count(self, kind: str) -> int:
+        return len(self.hits(kind))
+
+    def contains(self, literal: str) -> bool:
+        return literal in self.code
+
+    def line_at(self, offset: int) -> str:
+        """The masked code line holding `offset`."""
+        code = self.code
+        end = code.find('\n', offset)
+        return code[code.rfind('\n', 0, offset) + 1:len(code) if end == -1 else end]
+
+    def lines_with(self, kind: str) -> List[int]:
+        """Distinct line numbers (ascending) holding at least one `kind` hit."""
+        out: List[int] = []
+        for n in self.hits(kind):
+            if not out or out[-1] != n:
+                out.append(n)
+        return out
+
+
+# ─── Palette Index ────────────────────────────────────────────────────────────
+# Hardcoded Color(0x...) literals are matched to the closest colour of the
+# data/flutter_colors.csv palettes, in CIELAB so the distance follows what
+# the eye sees. Each column maps to the ColorScheme role that colour plays.
+COLOR_ROLES = {
+    "Primary (Hex)":         "primary",
+    "Secondary (Hex)":       "secondary",
+    "CTA (Hex)":             "tertiary",
+    "Background (Hex)":      "surface",
+    "Surface (Hex)":         "surfaceContainer",
+    "Text (Hex)":            "onSurface",
+    "Border (Hex)":          "outline",
+    "Dark Primary (Hex)":    "primary",
+    "Dark Background (Hex)": "surface",
+    "Dark Surface (Hex)":    "surfaceContainer",
+}
+# Below this CIELAB distance two colours are indistinguishable side by side.
+SAME_COLOR_DELTA = 2.3
+# Palette colours per k-d tree leaf: leaves are scanned in a tight loop,
+# which beats descending to single points in Python.
+PALETTE_LEAF_SIZE = 8
+
+
+# sRGB channel value (0-255) -> linear light.
+_LINEAR = [c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+           for c in (v / 255 for v in range(256))]
+
+
+def _lab(rgb: int) -> Tuple[float, float, float]:
+    """CIELAB (D65) coordinates of a 0xRRGGBB colour."""
+    r, g, b = _LINEAR[rgb >> 16 & 0xFF], _LINEAR[rgb >> 8 & 0xFF], _LINEAR[rgb & 0xFF]
+    xyz = ((0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047,
+           0.2126 * r + 0.7152 * g + 0.0722 * b,
+           (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883)
+    fx, fy, fz = (t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116 for t in xyz)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+class PaletteColor:
+    """One distinct palette colour and where the palettes use it."""
+    __slots__ = ("rgb", "palette", "column", "role", "uses")
+
+    def __init__(self, rgb: int, palette: str, column: str, uses: int):
+        self.rgb     = rgb
+        self.palette = palette   # App Type of the first palette using it in `column`
+        self.column  = column    # the column it appears in most often
+        self.role    = COLOR_ROLES[column]
+        self.uses    = uses      # palette cells holding this colour
+
+    @property
+    def dark(self) -> bool:
+        return self.column.startswith("Dark ")
+
+
+class PaletteIndex:
+    """Nearest palette colour lookup over a k-d tree of CIELAB points.
+
+    Cells repeated across palettes (#FFFFFF surfaces, ...) are one point.
+    Lookups are memoised per colour value, so a project with tens of
+    thousands of literals walks the tree once per distinct colour.
+    """
+
+    def __init__(self, rows: List[dict]):
+        cells: Dict[int, Dict[str, List[str]]] = {}
+        for row in rows:
+            for column in COLOR_ROLES:
+                value = (row.get(column) or "").strip().lstrip("#")
+                if len(value) == 6:
+                    try:
+                        rgb = int(value, 16)
+                    except ValueError:
+                        continue
+                    cells.setdefault(rgb, {}).setdefault(column, []).append(row.get("App Type", ""))
+        self.colors: List[PaletteColor] = []
+        for rgb, columns in cells.items():
+            column = max(columns, key=lambda c: len(columns[c]))
+            self.colors.append(PaletteColor(rgb, columns[column][0], column,
+                                            sum(len(p) for p in columns.values())))
+        self.cells = sum(color.uses for color in self.colors)
+        points = [_lab(color.rgb) for color in self.colors]
+        # Node: (axis, split, below, above) inside the tree, or
+        # (-1, 0.0, [(L, a, b, color index), ...], None) for a leaf.
+        self._nodes: List[tuple] = []
+        self._root = self._build(points, list(range(len(points))), 0) if points else -1
+        self._memo: Dict[int, Optional[Tuple[PaletteColor, float]]] = {}
+
+    def _build(self, points: List[Tuple[float, float, float]], members: List[int], depth: int) -> int:
+        if len(members) <= PALETTE_LEAF_SIZE:
+            self._nodes.append((-1, 0.0, [points[i] + (i,) for i in members], None))
+        else:
+            axis = depth % 3
+            members.sort(key=lambda i: points[i][axis])
+            mid = len(members) // 2
+            below = self._build(points, members[:mid], depth + 1)
+            above = self._build(points, members[mid:], depth + 1)
+            self._nodes.append((axis, points[members[mid]][axis], below, above))
+        return len(self._nodes) - 1
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def nearest(self, rgb: int) -> Optional[Tuple[PaletteColor, float]]:
+        """(closest palette colour, CIELAB distance) of 0xRRGGBB `rgb`."""
+        rgb &= 0xFFFFFF
+        if rgb in self._memo:
+            return self._memo[rgb]
+        found = None
+        if self._root != -1:
+            target = x, y, z = _lab(rgb)
+            nodes = self._nodes
+            best, best_d2 = -1, float("inf")
+            # (node, squared distance from the target to the node's half-space)
+            stack = [(self._root, 0.0)]
+            while stack:
+                node, bound = stack.pop()
+                if bound >= best_d2:
+                    continue
+                axis, split, below, above = nodes[node]
+                if axis < 0:
+                    for px, py, pz, i in below:
+                        d2 = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                        if d2 < best_d2:
+                            best, best_d2 = i, d2
+                    continue
+                gap = target[axis] - split
+                if gap < 0:
+                    stack.append((above, gap * gap))
+                    stack.append((below, 0.0))
+                else:
+                    stack.append((below, gap * gap))
+                    stack.append((above, 0.0))
+            found = (self.colors[best], math.sqrt(best_d2))
+        self._memo[rgb] = found
+        return found
+
+    def nearest_many(self, values) -> Dict[int, Optional[Tuple[PaletteColor, float]]]:
+        """nearest() of every distinct value in `values`."""
+        return {value: self.nearest(value) for value in set(values)}
+
+
+_PALETTE: Optional[PaletteIndex] = None
+
+
+def palette_index() -> PaletteIndex:
+    """The index over data/flutter_colors.csv, built once per process."""
+    global _PALETTE
+    if _PALETTE is None:
+        _PALETTE = PaletteIndex(knowledge_base.load_table("colors"))
+    return _PALETTE
+
+
+@lru_cache(maxsize=None)
+def color_hint(argb: int) -> Optional[str]:
+    """"colorScheme.primary (closest: Fintech Primary #2563EB, ΔE 1.2)", or
+    None without palettes. Palettes are opaque, so a translucent literal keeps
+    its alpha through .withValues(); a fully transparent one gets no hint."""
+    alpha = argb >> 24
+    found = palette_index().nearest(argb) if alpha else None
+    if found is None:
+        return None
+    color, delta = found
+    closeness = "same colour" if delta < SAME_COLOR_DELTA else f"ΔE {delta:.1f}"
+    theme = ", dark theme" if color.dark else ""
+    opacity = f".withValues(alpha: {alpha / 255:.2f})" if alpha < 0xFF else ""
+    return (f"colorScheme.{color.role}{opacity} (closest: {color.palette} "
+            f"{color.column.replace(' (Hex)', '')} #{color.rgb:06X}, {closeness}{theme})")
+
+
+def _color_values(scan: SourceScan) -> List[int]:
+    """ARGB value of every Color(0x...) hit, parallel to scan.hits("color")."""
+    code = scan.code
+    return [int(code[pos + 8:code.find(')', pos + 8)], 16) for pos in scan.offsets("color")]
+
+
+# ─── Animation Budgets ────────────────────────────────────────────────────────
+# data/flutter_animations.csv recommends a duration (ms) and curve for each
+# animation use case, naming the widgets / APIs that play it. It is read
+# once per process into a table from API name to budget: the longest
+# duration any of that API's use cases recommends. Route transitions are
+# looked up under the CSV's PageTransitionsTheme / GoRouter row, and other
+# implicit Animated* widgets are held to the longest duration the CSV
+# recommends for anything.
+ANIMATION_ALIASES = {"PageRouteBuilder": "PageTransitionsTheme", "CustomTransitionPage": "GoRouter"}
+ANIMATION_DURATION_ARGS = ("duration", "reverseDuration", "transitionDuration",
+                           "reverseTransitionDuration", "animationDuration")
+DURATION_UNITS_MS = {"days": 86_400_000, "hours": 3_600_000, "minutes": 60_000,
+                     "seconds": 1000, "milliseconds": 1, "microseconds": 0.001}
+_API_NAME_RE = re.compile(r'[A-Za-z_][\w.]*')
+_CURVE_NAME_RE = re.compile(r'[a-z][A-Za-z]+')
+_CURVE_ARG_RE = re.compile(r'\s*Curves\.([A-Za-z]+)\s*$')
+_DURATION_ARG_RE = re.compile(r'([A-Za-z]+)\s*:\s*(?:const\s+)?$')
+
+
+class AnimationBudget:
+    """The longest recommended duration for one API, and its use case."""
+    __slots__ = ("ms", "use_case", "curve", "curves")
+
+    def __init__(self, ms: int, use_case: str, curve: str, curves: Set[str]):
+        self.ms       = ms
+        self.use_case = use_case   # Animation Name of the row setting `ms`
+        self.curve    = curve      # that row's curve
+        self.curves   = curves     # every curve recommended for the API
+
+
+class AnimationBudgets:
+    """API name -> AnimationBudget, built from the animations table."""
+
+    def __init__(self, rows):
+        self.by_api: Dict[str, AnimationBudget] = {}
+        self.longest: Optional[AnimationBudget] = None
+        for row in rows:
+            ms = row.get("Duration (ms)", "").strip()
+            if not ms.isdigit():
+                continue  # "–", "50 per item", "1200 loop": no single duration to hold calls to
+            curves = set(_CURVE_NAME_RE.findall(row.get("Curve", "")))
+            curve = next(iter(_CURVE_NAME_RE.findall(row.get("Curve", ""))), "")
+            budget = AnimationBudget(int(ms), row.get("Animation Name", ""), curve, curves)
+            if self.longest is None or budget.ms > self.longest.ms:
+                self.longest = budget
+            for api in _API_NAME_RE.findall(row.get("Flutter Widget / API", "")):
+                if not api[:1].isupper() and not any(c.isupper() for c in api):
+                    continue  # prose ("custom", "package"), not an API name
+                known = self.by_api.get(api)
+                if known is None:
+                    self.by_api[api] = AnimationBudget(budget.ms, budget.use_case, curve, set(curves))
+                    continue
+                known.curves |= curves
+                if budget.ms > known.ms:
+                    known.ms, known.use_case, known.curve = budget.ms, budget.use_case, curve
+
+    def lookup(self, callee: str) -> Optional[AnimationBudget]:
+        """The budget for a call to `callee` ("AnimatedContainer", "PageRouteBuilder", ...)."""
+        budget = self.by_api.get(ANIMATION_ALIASES.get(callee, callee))
+        if budget is None and (callee.startswith("Animated") or callee == "TweenAnimationBuilder"):
+            budget = self.longest
+        return budget
+
+
+_ANIMATION_BUDGETS: Optional[AnimationBudgets] = None
+
+
+def animation_budgets() -> AnimationBudgets:
+    """The table over data/flutter_animations.csv, built once per process."""
+    global _ANIMATION_BUDGETS
+    if _ANIMATION_BUDGETS is None:
+        _ANIMATION_BUDGETS = AnimationBudgets(knowledge_base.load_table("animations"))
+    return _ANIMATION_BUDGETS
+
+
+def _duration_ms(code: str, pairs: Dict[int, int], open_paren: int) -> Optional[float]:
+    """Milliseconds of a Duration(...) call with only literal arguments."""
+    args = _named_args(code, pairs, open_paren)
+    total = 0.0
+    for unit, (start, end) in args.items():
+        value = code[start:end].strip()
+        if unit not in DURATION_UNITS_MS or not _NUMBER_RE.fullmatch(value):
+            return None
+        total += float(value) * DURATION_UNITS_MS[unit]
+    return total if args else None
+
+
 # ─── Checks ───────────────────────────────────────────────────────────────────
-def check_hardcoded_colors(file: Path, lines: List[str]) -> List[Issue]:
+def check_hardcoded_colors(file: str, scan: SourceScan) -> List[Issue]:
+    issues = []
+    # Match Color(0xFF...) or Color(0xAA...); one issue per line.
+    by_line: Dict[int, List[int]] = {}
+    for line, argb in zip(scan.hits("color"), _color_values(scan)):
+        values = by_line.setdefault(line, [])
+        if argb not in values:
+            values.append(argb)
+    for i, values in by_line.items():
+        literals = [f"Color(0x{argb:08X})" for argb in values]
+        hints = [color_hint(argb) for argb in values]
+        issues.append(Issue(
+            severity="CRITICAL", category="Theming",
+            file=file, line=i,
+            message=f"Hardcoded {', '.join(literals)} value{'s' if len(values) > 1 else ''} found",
+            suggestion=("Replace " + "; ".join(f"{literal} with Theme.of(context).{hint}"
+                                                for literal, hint in zip(literals, hints)) + "."
+                        if all(hints) else
+                        "Use Theme.of(context).colorScheme.* instead of hardcoded Color(0xFF...) values.")
+        ))
+    return issues
+
+
+def check_color_usage(file: str, scan: SourceScan) -> Dict[int, int]:
+    """Uses of each distinct ARGB value among the file's Color(0x...) literals."""
+    return dict(Counter(_color_values(scan)))
+
+
+def check_large_build_methods(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    for i, line in enumerate(lines, 1):
-        # Match Color(0xFF...) or Color(0xAA...)
-        if re.search(r'Color\(0x[0-9A-Fa-f]{6,8}\)', line):
+    if 'build' not in scan.code:
+        return issues
+
+    scopes = scan.scopes
+    for build in scopes.builds():
+        build_start = scopes.line_of(build.head)
+        build_len = scopes.line_of(build.end - 1) - build_start
+        if build_len > 60:
             issues.append(Issue(
-                severity="CRITICAL", category="Theming",
-                file=str(file), line=i,
-                message="Hardcoded Color() value found",
-                suggestion="Use Theme.of(context).colorScheme.* instead of hardcoded Color(0xFF...) values."
+                severity="CRITICAL" if build_len > 100 else "HIGH",
+                category="Widgets",
+                file=file, line=build_start,
+                message=f"build() method is {build_len} lines long",
+                suggestion="Extract sub-widgets into separate Widget methods or classes. Keep build() < 50 lines."
             ))
+
     return issues
 
 
-def check_large_build_methods(file: Path, lines: List[str]) -> List[Issue]:
-    issues = []
-    in_build = False
-    build_start = 0
-    depth = 0
+# Calls to constructors that are const whenever their arguments are. The
+# pattern starts with its literal and checks what precedes it afterwards,
+# so `re` can skip ahead to the literal instead of trying every offset.
+_CONST_CALL_RE = re.compile(
+    r'(?:Text|Icon|Padding|SizedBox(?:\.[\w$]+)?|EdgeInsets\.[\w$]+)\s*\(')
+# `const` opening a const context: a constructor call or collection literal
+# (ending at its opening bracket) or a declaration (ending at its '=').
+# Only tried at the file's `const` keyword hits.
+_CONST_CONTEXT_RE = re.compile(
+    r'const(?<![\w$]const)\s+(?:(?:[A-Za-z_$][\w$.]*\s*)?(?:<[^;{}()]*>\s*)?[(\[{]'
+    r'|[A-Za-z_$][\w$<>?, ]*=(?!=))')
+# An argument that is a constant on its own: a number, a string without
+# interpolation (masked to blanks), true/false/null, or a static member
+# such as Icons.add, Colors.red, MainAxisAlignment.center.
+_CONST_VALUE_RE = re.compile(
+    r'-?\s*(?:0[xX][0-9A-Fa-f]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+    r'''|(?:r?(?:\'\'\'\s*\'\'\'|"""\s*"""|' *'|" *")\s*)+'''
+    r'|true|false|null|(?:[A-Z][\w$]*|double)\.[A-Za-z_$][\w$]*')
 
-    for i, line in enumerate(lines, 1):
-        stripped = line.strip()
 
-        if re.match(r'Widget\s+build\(BuildContext\s+\w+\)', stripped):
-            in_build = True
-            build_start = i
-            depth = 0
+_WORD_OR_DOT = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$.")
 
-        if in_build:
-            depth += stripped.count('{') - stripped.count('}')
-            if depth <= 0 and i > build_start:
-                build_len = i - build_start
-                if build_len > 60:
-                    issues.append(Issue(
-                        severity="CRITICAL" if build_len > 100 else "HIGH",
-                        category="Widgets",
-                        file=str(file), line=build_start,
-                        message=f"build() method is {build_len} lines long",
-                        suggestion="Extract sub-widgets into separate Widget methods or classes. Keep build() < 50 lines."
-                    ))
-                in_build = False
 
-    return issues
+def _const_regions(code: str, pairs: Dict[int, int], consts: List[int],
+                   limit: int) -> List[Tuple[int, int]]:
+    """Outermost (start, end) spans of `code` that are a const context, for
+    contexts opening before `limit`. `consts` are the offsets of the file's
+    `const` keywords, the only places a context can open."""
+    regions: List[Tuple[int, int]] = []
+    i, count = 0, bisect_left(consts, limit)
+    while i < count:
+        m = _CONST_CONTEXT_RE.match(code, consts[i], limit)
+        i += 1
+        if m:
+            if code[m.end() - 1] == '=':
+                end = code.find(';', m.end())
+            else:
+                end = pairs.get(m.end() - 1, len(code))
+            end = len(code) if end == -1 else end
+            regions.append((m.start(), end))
+            i = bisect_left(consts, end, i)  # Contexts nested in this one add nothing.
+    return regions
 
 
-def check_missing_const(file: Path, lines: List[str]) -> List[Issue]:
-    issues = []
-    const_candidates = re.compile(
-        r'(?<!\bconst\s)\b(Text|Icon|Padding|SizedBox|EdgeInsets|Column|Row|Container)\('
-    )
-    for i, line in enumerate(lines, 1):
-        if const_candidates.search(line) and 'const ' not in line:
-            if 'var ' not in line and '=' not in line.split('(')[0]:
-                pass  # Too noisy to report every instance
-    return issues  # Keep low noise — report in summary only
+def check_const_coverage(file: str, scan: SourceScan) -> Tuple[int, List[int]]:
+    """(const calls, lines of calls that could be const but are not) among
+    the Text / Icon / SizedBox / EdgeInsets / Padding calls of one file.
+
+    A call could be const when every argument is a literal, a static member,
+    a const expression or another such call. Calls inside a const context
+    (`const [...]`, `const Row(...)`, `const x = ...;`) count as const.
+    """
+    code = scan.code
+    calls = [m for m in _CONST_CALL_RE.finditer(code)
+             if not m.start() or code[m.start() - 1] not in _WORD_OR_DOT]  # not TextField(, _Text(, ...
+    if not calls:
+        return 0, []
+    pairs = scan.pairs
+    consts = scan.offsets("const")
+    regions = _const_regions(code, pairs, consts, calls[-1].start())
+    constable: Dict[str, bool] = {}
 
+    def literal_args(paren: int) -> bool:
+        # Whether the arguments are constant depends only on their (masked)
+        # text, and calls repeat the same arguments: Text('  ') is one entry.
+        close = pairs.get(paren, len(code))
+        inner = code[paren + 1:close]
+        known = constable.get(inner)
+        if known is None:
+            known = constable[inner] = all(
+                literal_value(start, end) for start, end in _split_top_level(code, pairs, paren + 1, close))
+        return known
 
-def check_stateful_ratio(file: Path, lines: List[str]) -> Tuple[int, int]:
+    def literal_value(start: int, end: int) -> bool:
+        m = _ARG_NAME_RE.match(code, start, end)
+        raw = code[m.end() if m else start:end]
+        value = raw.strip()
+        if _CONST_VALUE_RE.fullmatch(value) or value.startswith("const") and value[5:6].isspace():
+            return True
+        # Otherwise only a whole nested call that could be const itself.
+        first = end - len(raw.lstrip())
+        call = _CONST_CALL_RE.match(code, first)
+        return (call is not None and code[first - 1] not in _WORD_OR_DOT
+                and pairs.get(call.end() - 1) == first + len(value) - 1
+                and literal_args(call.end() - 1))
+
+    # Calls, regions and `const` keywords are all in file order: walk them
+    # together rather than searching for each call.
+    const = 0
+    missing: List[int] = []
+    line_no, last = 1, 0
+    r = k = 0
+    regions.append((len(code), len(code)))
+    consts = consts + [len(code)]
+    for m in calls:
+        head = m.start()
+        while regions[r][1] <= head:
+            r += 1
+        while consts[k] < head:
+            k += 1
+        before = consts[k - 1] + 5 if k else head   # just after the last `const`
+        if regions[r][0] <= head or before < head and head - before < 60 and code[before:head].isspace():
+            const += 1
+        elif literal_args(m.end() - 1):
+            line_no += code.count('\n', last, head)
+            last = head
+            missing.append(line_no)
+    return const, missing
+
+
+def check_stateful_ratio(file: str, scan: SourceScan) -> Tuple[int, int]:
     """Return (stateful_count, stateless_count)."""
-    full = '\n'.join(lines)
-    stateful  = len(re.findall(r'extends\s+StatefulWidget', full))
-    stateless = len(re.findall(r'extends\s+StatelessWidget', full))
-    return stateful, stateless
+    return scan.count("stateful"), scan.count("stateless")
 
 
-def check_dark_theme(file: Path, lines: List[str]) -> List[Issue]:
-    issues = []
-    full = '\n'.join(lines)
-    if 'MaterialApp' in full and 'darkTheme' not in full and 'theme:' in full:
-        issues.append(Issue(
-            severity="HIGH", category="Theming",
-            file=str(file), line=None,
-            message="MaterialApp found without darkTheme",
-            suggestion="Add darkTheme: ThemeData(brightness: Brightness.dark, colorScheme: ColorScheme.fromSeed(..., brightness: Brightness.dark)) to MaterialApp."
-        ))
-    return issues
+# FileResult.theme bits; check_dark_theme reads them off the import graph.
+APP_WITHOUT_DARK_THEME = 1   # a MaterialApp given a theme: but no darkTheme:
+DEFINES_DARK_THEME     = 2   # builds a dark ThemeData or ColorScheme
+
 
+def check_app_theme(file: str, scan: SourceScan) -> int:
+    """Return the file's FileResult.theme bits."""
+    bits = 0
+    if scan.contains('MaterialApp') and not scan.contains('darkTheme') and scan.contains('theme:'):
+        bits |= APP_WITHOUT_DARK_THEME
+    if scan.contains('Brightness.dark') or scan.contains('ThemeData.dark(') or scan.contains('ColorScheme.dark('):
+        bits |= DEFINES_DARK_THEME
+    return bits
 
-def check_missing_semantics(file: Path, lines: List[str]) -> List[Issue]:
+
+def check_missing_semantics(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    full = '\n'.join(lines)
-    image_count    = len(re.findall(r'Image\.(asset|network)\(', full))
-    semantics_refs = len(re.findall(r'semanticsLabel|excludeFromSemantics', full))
-    semantic_wrap  = len(re.findall(r'Semantics\(', full))
+    image_count = scan.count("asset") + scan.count("network")
+
+    semantics = (scan.contains('semanticsLabel') or scan.contains('excludeFromSemantics')
+                 or scan.contains('Semantics('))
 
-    if image_count > 0 and (semantics_refs + semantic_wrap) == 0:
+    if image_count > 0 and not semantics:
         issues.append(Issue(
             severity="HIGH", category="Accessibility",
-            file=str(file), line=None,
+            file=file, line=None,
             message=f"{image_count} Image widget(s) found without any semanticsLabel or Semantics wrapper",
             suggestion="Add semanticsLabel: 'Description' to Image widgets, or wrap with Semantics(label: ...) or use excludeFromSemantics: true for purely decorative images."
         ))
     return issues
 
 
-def check_listview_usage(file: Path, lines: List[str]) -> List[Issue]:
+def check_listview_usage(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    for i, line in enumerate(lines, 1):
+    last = 0
+    for i, offset in zip(scan.hits("listview"), scan.offsets("listview")):
+        line = scan.line_at(offset)
         # ListView with children: [...] directly
-        if re.search(r'ListView\s*\(', line) and 'builder' not in line and 'separated' not in line:
+        if i != last and 'builder' not in line and 'separated' not in line:
+            last = i
             issues.append(Issue(
                 severity="HIGH", category="Performance",
-                file=str(file), line=i,
+                file=file, line=i,
                 message="ListView(...) used without .builder — may cause performance issues for large lists",
                 suggestion="Use ListView.builder(itemCount: items.length, itemBuilder: ...) for lazy loading. Only use ListView(children: [...]) for very short, static lists."
             ))
     return issues
 
 
-def check_setstate_in_build(file: Path, lines: List[str]) -> List[Issue]:
+def check_setstate_in_build(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    in_build = False
-    for i, line in enumerate(lines, 1):
-        if re.match(r'\s*Widget\s+build\(', line):
-            in_build = True
-        if in_build and re.search(r'setState\s*\(', line):
+    offsets = scan.offsets("setstate")
+    if not offsets:
+        return issues
+
+    # Only calls made by build() itself: setState inside a callback defined
+    # in build (onPressed: () => setState(...)) runs later and is fine.
+    scopes = scan.scopes
+    last = 0
+    for i, offset in zip(scan.hits("setstate"), offsets):
+        fn = scopes.function_at(offset)
+        if fn is not None and fn.is_build and i != last:
+            last = i
             issues.append(Issue(
                 severity="CRITICAL", category="State",
-                file=str(file), line=i,
-                message="setState() called inside or near build() method",
+                file=file, line=i,
+                message="setState() called inside build() method",
                 suggestion="Only call setState() inside event handlers (onPressed, onChanged, etc.) not in build()."
             ))
-        if in_build and line.strip().startswith('return '):
-            in_build = False
     return issues
 
 
-def check_context_after_async(file: Path, lines: List[str]) -> List[Issue]:
-    issues = []
-    for i, line in enumerate(lines, 1):
-        # Naive check: context used after await without mounted check nearby
-        if 'await ' in line and i < len(lines):
-            nearby = '\n'.join(lines[i:min(i+5, len(lines))])
-            if 'context' in nearby and 'mounted' not in nearby:
-                issues.append(Issue(
-                    severity="CRITICAL", category="State",
-                    file=str(file), line=i+1,
-                    message="BuildContext used after async gap without mounted check",
-                    suggestion="Add 'if (!mounted) return;' or 'if (mounted) ...' before using BuildContext after any await."
-                ))
-    return issues
+_MOUNTED_MEMBER_RE = re.compile(r'\s*\??\.\s*mounted(?![\w$])')
 
 
-def check_cached_images(file: Path, lines: List[str]) -> List[Issue]:
+def check_context_after_async(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    for i, line in enumerate(lines, 1):
-        if re.search(r'Image\.network\(', line):
+    awaits = scan.offsets("await")
+    if not awaits:
+        return issues
+
+    # One pass over the await / mounted / context hits in file order. Each
+    # function keeps the offset of its last completed await and last mounted
+    # check; a context use is unguarded when, over the function and the
+    # closures it sits in, the latest await is newer than the latest check.
+    # An await's gap opens once its statement ends, so `await f(context)`
+    # itself is fine, and the `context` in a `context.mounted` guard is the
+    # check rather than a use.
+    scopes = scan.scopes
+    code = scan.code
+    events = [(scopes.expression_end(a), 0, a) for a in awaits]
+    events += [(m, 1, m) for m in scan.offsets("mounted")]
+    events += [(c, 2, i) for c, i in zip(scan.offsets("context"), scan.hits("context"))
+               if not _MOUNTED_MEMBER_RE.match(code, c + len("context"))]
+    events.sort()
+
+    gap: Dict[Scope, int] = {}
+    checked: Dict[Scope, int] = {}
+    last = 0
+    for offset, kind, value in events:
+        if kind == 0:
+            fn = scopes.function_at(value)
+            if fn is not None:
+                gap[fn] = value
+            continue
+        fn = scopes.function_at(offset)
+        if kind == 1:
+            if fn is not None:
+                checked[fn] = offset
+            continue
+        latest_gap = latest_check = -1
+        while fn is not None:
+            latest_gap = max(latest_gap, gap.get(fn, -1))
+            latest_check = max(latest_check, checked.get(fn, -1))
+            if fn.kind != "closure":
+                break
+            fn = scopes.function_at(fn.head)
+        if latest_gap > latest_check and value != last:
+            last = value
             issues.append(Issue(
-                severity="HIGH", category="Performance",
-                file=str(file), line=i,
-                message="Image.network() used without caching",
-                suggestion="Replace with CachedNetworkImage from 'cached_network_image' package for automatic caching and placeholder support."
+                severity="CRITICAL", category="State",
+                file=file, line=value,
+                message="BuildContext used after async gap without mounted check",
+                suggestion="Add 'if (!mounted) return;' or 'if (mounted) ...' before using BuildContext after any await."
             ))
     return issues
 
 
-def check_material3(file: Path, lines: List[str]) -> List[Issue]:
+def check_cached_images(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    full = '\n'.join(lines)
-    if 'ThemeData(' in full and 'useMaterial3' not in full:
+    code = scan.code
+    last = None
+    for i, offset in zip(scan.hits("network"), scan.offsets("network")):
+        if i == last:
+            continue
+        last = i
+        suggestion = "Replace with CachedNetworkImage from 'cached_network_image' package for automatic caching and placeholder support."
+        args = _named_args(code, scan.pairs, code.find('(', offset))
+        if not ("cacheWidth" in args or "cacheHeight" in args):
+            suggestion += (" Give it memCacheWidth: (width * MediaQuery.devicePixelRatioOf(context)).round()"
+                           " (or memCacheHeight) so the image is decoded at the size it is shown, not at full resolution.")
         issues.append(Issue(
-            severity="MEDIUM", category="Theming",
-            file=str(file), line=None,
-            message="ThemeData found without useMaterial3: true",
-            suggestion="Add useMaterial3: true to ThemeData for the latest Material design system."
+            severity="HIGH", category="Performance",
+            file=file, line=i,
+            message="Image.network() used without caching",
+            suggestion=suggestion
         ))
     return issues
 
 
-def check_pubspec(project_path: Path) -> List[Issue]:
+def check_material3(file: str, scan: SourceScan) -> List[Issue]:
     issues = []
-    pubspec = project_path / "pubspec.yaml"
-    if not pubspec.exists():
-        return issues
-    content = pubspec.read_text()
-    if 'cached_network_image' not in content:
-        issues.append(Issue(
-            severity="HIGH", category="Performance",
-            file="pubspec.yaml", line=None,
-            message="cached_network_image package not in dependencies",
-            suggestion="Add cached_network_image: ^3.4.1 to pubspec.yaml for efficient image loading."
-        ))
-    if 'google_fonts' not in content:
-        issues.append(Issue(
-            severity="LOW", category="Theming",
-            file="pubspec.yaml", line=None,
-            message="google_fonts package not in dependencies",
-            suggestion="Add google_fonts: ^6.2.1 to use 1000+ Google Fonts with zero configuration."
-        ))
-    if 'go_router' not in content:
+    if scan.contains('ThemeData(') and not scan.contains('useMaterial3'):
         issues.append(Issue(
-            severity="MEDIUM", category="Navigation",
-            file="pubspec.yaml", line=None,
-            message="go_router package not found",
-            suggestion="Add go_router: ^14.0.0 for declarative, type-safe routing with deep link support."
+            severity="MEDIUM", category="Theming",
+            file=file, line=None,
+            message="ThemeData found without useMaterial3: true",
+            suggestion="Add useMaterial3: true to ThemeData for the latest Material design system."
         ))
     return issues
 
 
-# ─── Main ─────────────────────────────────────────────────────────────────────
-def analyse_project(project_path: str, fix_suggestions: bool = False, as_json: bool = False):
-    path = Path(project_path)
-    if not path.exists():
-        print(red(f"ERROR: Path does not exist: {project_path}"))
-        sys.exit(1)
+# Rendering cost: widget patterns that make frames expensive to build or paint.
+LARGE_CHILDREN = 20        # children: [...] literals at least this long are reported
+SCROLLABLES = {"ListView", "GridView", "CustomScrollView", "SingleChildScrollView", "PageView",
+               "ReorderableListView", "NestedScrollView"}
+# MediaQuery.of(context).<property> -> the accessor that rebuilds only when it changes.
+MEDIAQUERY_ACCESSORS = {
+    "size": "sizeOf", "padding": "paddingOf", "viewInsets": "viewInsetsOf",
+    "viewPadding": "viewPaddingOf", "orientation": "orientationOf",
+    "devicePixelRatio": "devicePixelRatioOf", "textScaler": "textScalerOf",
+    "textScaleFactor": "textScalerOf", "platformBrightness": "platformBrightnessOf",
+    "alwaysUse24HourFormat": "alwaysUse24HourFormatOf", "disableAnimations": "disableAnimationsOf",
+    "accessibleNavigation": "accessibleNavigationOf", "highContrast": "highContrastOf",
+    "boldText": "boldTextOf", "displayFeatures": "displayFeaturesOf",
+}
+_NUMBER_RE       = re.compile(r'\d*\.?\d+')
+_PROPERTY_RE     = re.compile(r'\s*[!?]?\.\s*([A-Za-z_$][\w$]*)')
+_ITEM_BUILDER_RE = re.compile(r'(?:itemBuilder|separatorBuilder)\s*:\s*$|SliverChildBuilderDelegate\s*\(\s*$')
+_TEAROFF_RE      = re.compile(r'\s*:\s*([A-Za-z_$][\w$]*)\s*[,)]')
+# An opacity: expression that reads an Animation or AnimationController.
+_ANIMATED_VALUE_RE = re.compile(r'\.value(?![\w$])|[Aa]nimation|[Cc]ontroller|[Tt]ween')
 
-    dart_files = find_dart_files(path)
-    all_issues: List[Issue] = []
-    total_stateful  = 0
-    total_stateless = 0
-    total_files     = len(dart_files)
 
-    for file in dart_files:
-        lines = read_file(file)
-        rel = file.relative_to(path)
+def _item_builder_tearoffs(code: str) -> Set[str]:
+    """Methods passed by name as itemBuilder / separatorBuilder."""
+    names = set()
+    pos = code.find('Builder')
+    while pos != -1:
+        if code.endswith('item', 0, pos) or code.endswith('separator', 0, pos):
+            m = _TEAROFF_RE.match(code, pos + 7)
+            if m:
+                names.add(m.group(1))
+        pos = code.find('Builder', pos + 7)
+    return names
 
-        all_issues.extend(check_hardcoded_colors(rel, lines))
-        all_issues.extend(check_large_build_methods(rel, lines))
-        all_issues.extend(check_dark_theme(rel, lines))
-        all_issues.extend(check_missing_semantics(rel, lines))
-        all_issues.extend(check_listview_usage(rel, lines))
-        all_issues.extend(check_setstate_in_build(rel, lines))
-        all_issues.extend(check_context_after_async(rel, lines))
-        all_issues.extend(check_cached_images(rel, lines))
-        all_issues.extend(check_material3(rel, lines))
 
-        sf, sl = check_stateful_ratio(rel, lines)
-        total_stateful  += sf
-        total_stateless += sl
+def _member_start(scopes: ScopeIndex, offset: int) -> int:
+    """Start of the method (or class / top-level) body holding `offset`, looking
+    through closures, so call nesting can be followed inside build() and the
+    callbacks it defines."""
+    fn = scopes.function_at(offset)
+    while fn is not None and fn.kind == "closure":
+        outer = scopes.function_at(fn.head)
+        if outer is None:
+            break
+        fn = outer
+    scope = fn or scopes.innermost(offset)
+    return scope.start if scope is not None else 0
 
-    all_issues.extend(check_pubspec(path))
 
-    # Sort by severity
-    sev_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
-    all_issues.sort(key=lambda i: sev_order.get(i.severity, 4))
+def _outside_item_builder(code: str, scopes: ScopeIndex, offset: int) -> int:
+    """_member_start(), except that the search stops at the body of an
+    itemBuilder closure: what it builds is one lazily created item."""
+    fn = scopes.function_at(offset)
+    while fn is not None and fn.kind == "closure":
+        if _ITEM_BUILDER_RE.search(code, max(0, fn.head - 60), fn.head):
+            return fn.start
+        fn = scopes.function_at(fn.head)
+    return _member_start(scopes, offset)
 
-    if as_json:
-        print(json.dumps([i.to_dict() for i in all_issues], indent=2))
-        return
 
-    # ── Report ─────────────────────────────────────────────────────────────
-    print(f"\n{bold('━' * 60)}")
-    print(f"{bold('🎨 Flutter AI UI — Project Audit Report')}")
-    print(f"{bold('━' * 60)}\n")
-    print(f"  📁 Project : {project_path}")
-    print(f"  🗂️  Files    : {total_files} Dart files analysed")
-    print(f"  🧱 Widgets  : {total_stateful} StatefulWidget, {total_stateless} StatelessWidget")
-    ratio = f"{total_stateful/(total_stateful+total_stateless)*100:.0f}%" if (total_stateful + total_stateless) > 0 else "–"
-    print(f"  📊 Stateful ratio: {ratio} (target < 30%)")
+def check_opacity_widgets(file: str, scan: SourceScan) -> List[Issue]:
+    issues = []
+    code = scan.code
+    for i, offset in zip(scan.hits("opacity"), scan.offsets("opacity")):
+        value_span = _named_args(code, scan.pairs, code.find('(', offset)).get("opacity")
+        value = code[value_span[0]:value_span[1]].strip() if value_span else ""
+        if _NUMBER_RE.fullmatch(value):
+            if float(value) in (0.0, 1.0):
+                continue  # Fully clear or opaque: Flutter skips the layer
+            issues.append(Issue(
+                severity="MEDIUM", category="Performance",
+                file=file, line=i,
+                message=f"Opacity(opacity: {value}) paints its child into an offscreen layer",
+                suggestion="For a fixed translucency, apply the alpha to the colour itself (color.withValues(alpha: ...)) or the image (color + BlendMode.modulate) instead of wrapping in Opacity."
+            ))
+        elif _ANIMATED_VALUE_RE.search(value):
+            issues.append(Issue(
+                severity="HIGH", category="Performance",
+                file=file, line=i,
+                message="Opacity driven by an animation rebuilds and repaints its subtree on every frame",
+                suggestion="Use FadeTransition(opacity: animation) with the controller, or AnimatedOpacity for an implicit fade: they fade the layer without rebuilding the child."
+            ))
+        elif value:
+            issues.append(Issue(
+                severity="LOW", category="Performance",
+                file=file, line=i,
+                message="Opacity paints its child into an offscreen layer whenever it is translucent",
+                suggestion="If the value only switches between fixed levels (e.g. enabled ? 1.0 : 0.4), apply the alpha to the colours instead; if it changes over time, use AnimatedOpacity."
+            ))
+    return issues
 
-    counts = {}
-    for issue in all_issues:
-        counts[issue.severity] = counts.get(issue.severity, 0) + 1
 
-    print(f"\n  🔴 CRITICAL : {counts.get('CRITICAL', 0)}")
-    print(f"  🟠 HIGH     : {counts.get('HIGH', 0)}")
-    print(f"  🟡 MEDIUM   : {counts.get('MEDIUM', 0)}")
-    print(f"  🟢 LOW      : {counts.get('LOW', 0)}")
-    print(f"\n{bold('━' * 60)}\n")
+def check_savelayer_in_list_items(file: str, scan: SourceScan) -> List[Issue]:
+    issues = []
+    hits = [(offset, i, kind) for kind in ("cliprrect", "backdrop", "shadermask")
+            for i, offset in zip(scan.hits(kind), scan.offsets(kind))]
+    if not hits:
+        return issues
 
-    if not all_issues:
-        print(green("✅ No major issues found! Great work."))
-    else:
-        for issue in all_issues:
-            print(repr(issue))
+    # Item builders run once per visible row as the list scrolls: closures
+    # passed as itemBuilder (or to SliverChildBuilderDelegate), and methods
+    # torn off into itemBuilder: _buildItem.
+    code = scan.code
+    scopes = scan.scopes
+    tearoffs: List[Set[str]] = []
 
-    print(f"\n{bold('━' * 60)}")
-    print(f"  Total issues: {len(all_issues)}")
-    if all_issues:
-        print(f"\n  Tip: Address CRITICAL issues first, then HIGH.")
-        print(f"  Run with --json for machine-readable output.")
-    print(f"{bold('━' * 60)}\n")
+    def in_item_builder(offset: int) -> bool:
+        fn = scopes.function_at(offset)
+        while fn is not None and fn.kind == "closure":
+            if _ITEM_BUILDER_RE.search(code, max(0, fn.head - 60), fn.head):
+                return True
+            fn = scopes.function_at(fn.head)
+        if fn is None:
+            return False
+        if not tearoffs:
+            tearoffs.append(_item_builder_tearoffs(code))
+        return fn.name in tearoffs[0]
 
+    widgets = {
+        "cliprrect":  ("ClipRRect", "MEDIUM", "clips every item (anti-aliased) as the list scrolls",
+                       "Give the item a rounded shape instead (Card(shape: ...), DecoratedBox / Container with BoxDecoration(borderRadius: ...), or Material(borderRadius: ..., clipBehavior: Clip.antiAlias) on images)."),
+        "backdrop":   ("BackdropFilter", "HIGH", "blurs the backdrop through a saveLayer for every visible item",
+                       "Blur once behind the whole list (or use a pre-blurred image / translucent colour on items); never put BackdropFilter in itemBuilder."),
+        "shadermask": ("ShaderMask", "HIGH", "renders every item into a saveLayer to apply the shader",
+                       "Apply the gradient once over the list viewport (e.g. ShaderMask around the ListView) or bake it into the item's decoration."),
+    }
+    for offset, i, kind in sorted(hits):
+        if in_item_builder(offset):
+            name, severity, what, suggestion = widgets[kind]
+            issues.append(Issue(
+                severity=severity, category="Performance",
+                file=file, line=i,
+                message=f"{name} inside a list itemBuilder {what}",
+                suggestion=suggestion
+            ))
+    return issues
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(
-        description="Flutter AI UI — Project Audit Tool"
-    )
-    parser.add_argument("--path", required=True, help="Path to Flutter project root")
-    parser.add_argument("--fix-suggestions", action="store_true", help="Show detailed fix suggestions")
-    parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+def check_mediaquery_of(file: str, scan: SourceScan) -> List[Issue]:
+    issues = []
+    code = scan.code
+    for i, offset in zip(scan.hits("mediaquery"), scan.offsets("mediaquery")):
+        close = scan.pairs.get(code.find('(', offset), len(code))
+        m = _PROPERTY_RE.match(code, close + 1)
+        accessor = MEDIAQUERY_ACCESSORS.get(m.group(1)) if m else None
+        if accessor:
+            message = f"MediaQuery.of(context).{m.group(1)} rebuilds on any MediaQuery change"
+            suggestion = (f"Use MediaQuery.{accessor}(context): the widget then rebuilds only when "
+                          f"{m.group(1)} changes, not on every keyboard, inset or text-scale change.")
+        else:
+            message = "MediaQuery.of(context) rebuilds on any MediaQuery change"
+            suggestion = ("Read only what you need with MediaQuery.sizeOf / paddingOf / viewInsetsOf / "
+                          "textScalerOf(context), so keyboard and inset changes don't rebuild this widget.")
+        issues.append(Issue(
+            severity="MEDIUM", category="Performance",
+            file=file, line=i,
+            message=message,
+            suggestion=suggestion
+        ))
+    return issues
+
+
+_LIST_START_RE = re.compile(r'\s*(?:const\s*)?(?:<[^>]*>\s*)?\[')
+_GENERATED_ELEMENT_RE = re.compile(r'\s*(?:\.\.\.|for\b)')
+
+
+def _children(code: str, pairs: Dict[int, int], open_paren: int) -> Optional[Tuple[int, bool]]:
+    """(literal element count, built from a collection) for a call's
+    children: argument, or None without one."""
+    span = _named_args(code, pairs, open_paren).get("children")
+    if span is None:
+        return None
+    m = _LIST_START_RE.match(code, span[0], span[1])
+    if m is None:
+        return 0, True       # items.map(...).toList(), List.generate(...), a variable
+    start = m.end() - 1
+    elements = _split_top_level(code, pairs, start + 1, pairs.get(start, len(code)))
+    generated = any(_GENERATED_ELEMENT_RE.match(code, s, e) for s, e in elements)
+    return len(elements), generated
+
+
+def check_large_children(file: str, scan: SourceScan) -> List[Issue]:
+    issues = []
+    code = scan.code
+    for kind, widget in (("gridview", "GridView"), ("column", "Column")):
+        for i, offset in zip(scan.hits(kind), scan.offsets(kind)):
+            open_paren = code.find('(', offset)
+            children = _children(code, scan.pairs, open_paren)
+            if children is None:
+                continue
+            count, generated = children
+            if generated and widget == "GridView":
+                issues.append(Issue(
+                    severity="HIGH", category="Performance",
+                    file=file, line=i,
+                    message="GridView(children: ...) built from a collection creates every tile up front",
+                    suggestion="Use GridView.builder(itemCount: ..., itemBuilder: ...) so only visible tiles are built."
+                ))
+            elif generated:
+                floor = _outside_item_builder(code, scan.scopes, offset)
+                scroller = next((name for _, name in _enclosing_calls(code, offset, floor)
+                                 if name.split('.')[0] in SCROLLABLES), None)
+                if scroller:
+                    issues.append(Issue(
+                        severity="HIGH", category="Performance",
+                        file=file, line=i,
+                        message=f"Column inside {scroller} builds every generated child up front",
+                        suggestion="Replace the scrolling Column with ListView.builder (or a SliverList in a CustomScrollView) so children are built lazily as they scroll in."
+                    ))
+            elif count >= LARGE_CHILDREN:
+                issues.append(Issue(
+                    severity="MEDIUM", category="Performance",
+                    file=file, line=i,
+                    message=f"{widget} with {count} children builds and lays out all of them at once",
+                    suggestion=f"Split the {widget} into extracted (const) widgets, or use {'GridView.builder' if widget == 'GridView' else 'ListView.builder'} if it scrolls."
+                ))
+    return issues
+
+
+def check_image_decode_size(file: str, scan: SourceScan) -> List[Issue]:
+    """CachedNetworkImage without a decode size. Image.network gets the same
+    advice inside check_cached_images' issue."""
+    issues = []
+    code = scan.code
+    for i, offset in zip(scan.hits("cachednetwork"), scan.offsets("cachednetwork")):
+        args = _named_args(code, scan.pairs, code.find('(', offset))
+        if "memCacheWidth" not in args and "memCacheHeight" not in args:
+            issues.append(Issue(
+                severity="MEDIUM", category="Performance",
+                file=file, line=i,
+                message="CachedNetworkImage without memCacheWidth / memCacheHeight decodes at full resolution",
+                suggestion="Pass memCacheWidth: (width * MediaQuery.devicePixelRatioOf(context)).round() (or memCacheHeight) so the image is decoded at the size it is shown."
+            ))
+    return issues
+
+
+def check_nested_shrinkwrap(file: str, scan: SourceScan) -> List[Issue]:
+    issues = []
+    code = scan.code
+    for i, offset in zip(scan.hits("shrinkwrap"), scan.offsets("shrinkwrap")):
+        calls = _enclosing_calls(code, offset, _member_start(scan.scopes, offset))
+        if not calls or calls[0][1].split('.')[0] not in SCROLLABLES:
+            continue
+        outer = next((name for _, name in calls[1:] if name.split('.')[0] in SCROLLABLES), None)
+        if outer:
+            issues.append(Issue(
+                severity="HIGH", category="Performance",
+                file=file, line=i,
+                message=f"shrinkWrap: true on a {calls[0][1]} nested in {outer} lays out every child eagerly",
+                suggestion="Use one CustomScrollView with SliverList / SliverGrid slivers instead of nesting shrink-wrapped scrollables, or give the inner list a fixed height."
+            ))
+    return issues
+
+
+def check_animation_timing(file: str, scan: SourceScan) -> List[Issue]:
+    """Literal durations longer than flutter_animations.csv recommends for
+    the call they are passed to."""
+    issues = []
+    code = scan.code
+    budgets = animation_budgets()
+    for i, offset in zip(scan.hits("duration"), scan.offsets("duration")):
+        # Only a Duration passed straight as duration: (or a sibling) counts;
+        # Future.delayed and timeouts are skipped before any bracket walk.
+        arg = _DURATION_ARG_RE.search(code, max(0, offset - 40), offset)
+        if arg is None or arg.group(1) not in ANIMATION_DURATION_ARGS:
+            continue
+        ms = _duration_ms(code, scan.pairs, code.find('(', offset))
+        if ms is None:
+            continue
+        calls = _enclosing_calls(code, offset, _member_start(scan.scopes, offset))
+        if not calls:
+            continue
+        open_paren, callee = calls[0]
+        budget = budgets.lookup(callee)
+        if budget is None or ms <= budget.ms:
+            continue
+        args = _named_args(code, scan.pairs, open_paren)
+        arg = arg.group(1)
+        if code.startswith("..repeat(", scan.pairs.get(open_paren, len(code)) + 1):
+            continue  # A looping controller: its period is not a transition length.
+        curve_span = args.get("curve")
+        curve = _CURVE_ARG_RE.match(code[curve_span[0]:curve_span[1]]) if curve_span else None
+        advice = f"Duration(milliseconds: {budget.ms})"
+        if budget.curve and (curve is None or curve.group(1) not in budget.curves):
+            advice += f" and Curves.{budget.curve}"
+        issues.append(Issue(
+            severity="MEDIUM", category="Performance",
+            file=file, line=i,
+            message=f"{callee} {arg} of {ms:g} ms is longer than the {budget.ms} ms recommended ({budget.use_case})",
+            suggestion=(f"Use {advice}: transitions past the recommended length are what makes an app "
+                        "feel sluggish (see data/flutter_animations.csv).")
+        ))
+    return issues
+
+
+def check_animation_rebuilds(file: str, scan: SourceScan) -> List[Issue]:
+    """Animation patterns that rebuild a whole subtree on every frame."""
+    issues = []
+    code = scan.code
+    for kind, name in (("animbuilder", "AnimatedBuilder"), ("tweenbuilder", "TweenAnimationBuilder")):
+        for i, offset in zip(scan.hits(kind), scan.offsets(kind)):
+            args = _named_args(code, scan.pairs, code.find('(', offset))
+            if "builder" in args and "child" not in args:
+                issues.append(Issue(
+                    severity="MEDIUM", category="Performance",
+                    file=file, line=i,
+                    message=f"{name} without child: rebuilds its whole subtree on every animation frame",
+                    suggestion=f"Build the parts that don't animate once and pass them as {name}(child: ...); the builder receives them as its child argument."
+                ))
+    if scan.contains("AnimationController"):
+        for i, offset in zip(scan.hits("addlistener"), scan.offsets("addlistener")):
+            open_paren = code.find('(', offset)
+            if "setState" in code[open_paren:scan.pairs.get(open_paren, len(code))]:
+                issues.append(Issue(
+                    severity="HIGH", category="Performance",
+                    file=file, line=i,
+                    message="setState() in an animation listener rebuilds the whole State on every frame",
+                    suggestion="Drop the listener and let the animated part rebuild itself: AnimatedBuilder(animation: controller, ...) or a *Transition widget (FadeTransition, SlideTransition, ...)."
+                ))
+    return issues
+
+
+# Per-file rules, in report order. Each takes (relative path, SourceScan).
+FILE_RULES = [
+    check_hardcoded_colors,
+    check_large_build_methods,
+    check_missing_semantics,
+    check_listview_usage,
+    check_setstate_in_build,
+    check_context_after_async,
+    check_cached_images,
+    check_material3,
+    check_opacity_widgets,
+    check_savelayer_in_list_items,
+    check_mediaquery_of,
+    check_large_children,
+    check_image_decode_size,
+    check_nested_shrinkwrap,
+    check_animation_timing,
+    check_animation_rebuilds,
+]
+
+# Per-file rules that measure rather than report; analyse_file keeps their
+# numbers on the FileResult.
+METRIC_RULES = [check_stateful_ratio, check_const_coverage, check_color_usage, check_app_theme]
+
+# Byte literals without which a rule cannot fire: each is part of every
+# token or substring the rule needs. A file holding none of a rule's
+# triggers skips that rule, and a file holding no trigger at all (models,
+# services, ...) is never decoded. Masking only removes matches, so testing
+# the raw bytes is conservative.
+RULE_TRIGGERS: Dict[str, Tuple[bytes, ...]] = {
+    "check_hardcoded_colors":        (b"Color(0x",),
+    "check_large_build_methods":     (b"build",),
+    "check_missing_semantics":       (b"Image.asset(", b"Image.network("),
+    "check_listview_usage":          (b"ListView",),
+    "check_setstate_in_build":       (b"setState",),
+    "check_context_after_async":     (b"await ",),
+    "check_cached_images":           (b"Image.network(",),
+    "check_material3":               (b"ThemeData(",),
+    "check_opacity_widgets":         (b"Opacity",),
+    "check_savelayer_in_list_items": (b"ClipRRect", b"BackdropFilter", b"ShaderMask"),
+    "check_mediaquery_of":           (b"MediaQuery.of",),
+    "check_large_children":          (b"Column", b"GridView"),
+    "check_image_decode_size":       (b"CachedNetworkImage",),
+    "check_nested_shrinkwrap":       (b"shrinkWrap",),
+    "check_animation_timing":        (b"Duration",),
+    "check_animation_rebuilds":      (b"AnimatedBuilder", b"TweenAnimationBuilder", b"addListener"),
+    "check_stateful_ratio":          (b"StatefulWidget", b"StatelessWidget"),
+    "check_const_coverage":          (b"Text", b"Icon", b"SizedBox", b"EdgeInsets", b"Padding"),
+    "check_color_usage":             (b"Color(0x",),
+    "check_app_theme":               (b"MaterialApp", b"Brightness.dark", b"ThemeData.dark(",
+                                      b"ColorScheme.dark("),
+}
+
+
+def triggered_rules(data) -> List:
+    """The rules (FILE_RULES order, then METRIC_RULES) whose trigger
+    literals occur in `data` (bytes or mmap)."""
+    found: Dict[bytes, bool] = {}
+
+    def has(literal: bytes) -> bool:
+        hit = found.get(literal)
+        if hit is None:
+            hit = found[literal] = data.find(literal) != -1
+        return hit
+
+    return [rule for rule in FILE_RULES + METRIC_RULES
+            if any(has(literal) for literal in RULE_TRIGGERS[rule.__name__])]
+
+
+def rule_id(check) -> str:
+    """Stable id of a check function: check_setstate_in_build -> setstate_in_build."""
+    return check.__name__[len("check_"):]
+
+
+def check_pubspec(project_path: Path, root: Optional[Path] = None) -> List[Issue]:
+    """Dependency checks for one package; paths are reported relative to `root`."""
+    issues = []
+    pubspec = project_path / "pubspec.yaml"
+    if not pubspec.exists():
+        return issues
+    content = pubspec.read_text()
+    if re.search(r'^workspace:', content, re.M):
+        return issues  # A pub workspace root only lists its member packages.
+    rel = str(pubspec.relative_to(root)) if root else "pubspec.yaml"
+    if 'cached_network_image' not in content:
+        issues.append(Issue(
+            severity="HIGH", category="Performance",
+            file=rel, line=None,
+            message="cached_network_image package not in dependencies",
+            suggestion="Add cached_network_image: ^3.4.1 to pubspec.yaml for efficient image loading."
+        ))
+    if 'google_fonts' not in content:
+        issues.append(Issue(
+            severity="LOW", category="Theming",
+            file=rel, line=None,
+            message="google_fonts package not in dependencies",
+            suggestion="Add google_fonts: ^6.2.1 to use 1000+ Google Fonts with zero configuration."
+        ))
+    if 'go_router' not in content:
+        issues.append(Issue(
+            severity="MEDIUM", category="Navigation",
+            file=rel, line=None,
+            message="go_router package not found",
+            suggestion="Add go_router: ^14.0.0 for declarative, type-safe routing with deep link support."
+        ))
+    for issue in issues:
+        issue.rule = rule_id(check_pubspec)
+    return issues
+
+
+# ─── Analysis ─────────────────────────────────────────────────────────────────
+# Below this many files a process pool costs more to start than it saves.
+PARALLEL_MIN_FILES = 64
+# Files at least this big are memory-mapped rather than read into memory.
+MMAP_MIN_BYTES = 256 * 1024
+
+
+class FileResult:
+    """Everything the audit keeps about one Dart file.
+
+    `issues` is None when the file's content matched the digest it was
+    checked against, i.e. a cached result can be reused as-is. `profile`
+    is only filled in under --profile: {"bytes", "lines", "seconds": {stage: s}}.
+    `const_calls` and `const_missing` come from check_const_coverage,
+    `colors` ({argb: uses}) from check_color_usage, `theme` from
+    check_app_theme; `imports` are the file's import/export/part URIs.
+    """
+    __slots__ = ("file", "digest", "issues", "stateful", "stateless",
+                 "const_calls", "const_missing", "colors", "imports", "theme", "profile")
+
+    def __init__(self, file: str, digest: str, issues: Optional[List[Issue]],
+                 stateful: int = 0, stateless: int = 0, profile: Optional[dict] = None,
+                 const_calls: int = 0, const_missing: Optional[List[int]] = None,
+                 colors: Optional[Dict[int, int]] = None, imports: Optional[List[str]] = None,
+                 theme: int = 0):
+        self.file          = file
+        self.digest        = digest
+        self.issues        = issues
+        self.stateful      = stateful
+        self.stateless     = stateless
+        self.const_calls   = const_calls
+        self.const_missing = const_missing or []
+        self.colors        = colors or {}
+        self.imports       = imports or []
+        self.theme         = theme
+        self.profile       = profile
+
+    def with_issues(self, issues: List[Issue]) -> "FileResult":
+        """This result with `issues` in place of its own."""
+        return FileResult(self.file, self.digest, issues, self.stateful, self.stateless,
+                          self.profile, self.const_calls, self.const_missing, self.colors,
+                          self.imports, self.theme)
+
+
+def default_jobs() -> int:
+    """Number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def read_source(file: Path):
+    """A file's bytes; files over MMAP_MIN_BYTES are memory-mapped instead
+    of copied, so hashing and the trigger prefilter read the page cache."""
+    try:
+        with open(file, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_MIN_BYTES:
+                try:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    pass
+            return f.read()
+    except OSError:
+        return b""
+
+
+def analyse_file(file: Path, project_path: Path, known_digest: Optional[str] = None,
+                 profile: bool = False) -> FileResult:
+    """Run every per-file rule on one file, unless its content hashes to `known_digest`.
+
+    Only rules whose trigger literals occur in the raw bytes run, and the
+    file is only decoded if at least one does; its import directives are
+    read off the raw bytes either way. With `profile`, the file is
+    lexed up front and every stage is timed.
+    """
+    rel = str(file.relative_to(project_path))
+    clock = time.perf_counter()
+    data = read_source(file)
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == known_digest:
+        return FileResult(rel, digest, None)
+
+    seconds: Dict[str, float] = {}
+    if profile:
+        seconds["read_file"] = time.perf_counter() - clock
+        clock = time.perf_counter()
+    rules = triggered_rules(data)
+    if profile:
+        seconds["prefilter"] = time.perf_counter() - clock
+        clock = time.perf_counter()
+    imports = dart_directives(data)
+    if profile:
+        seconds["imports"] = time.perf_counter() - clock
+    if not rules:
+        stats = {"bytes": len(data), "lines": data.count(b"\n"), "seconds": seconds} if profile else None
+        return FileResult(rel, digest, [], profile=stats, imports=imports)
+
+    if isinstance(data, mmap.mmap):
+        with data:
+            data = data[:]
+    clock = time.perf_counter()
+    scan = SourceScan(decode_lines(data))
+    if profile:
+        seconds["read_file"] += time.perf_counter() - clock
+        clock = time.perf_counter()
+        scan.code, scan.scopes
+        seconds["lexer"] = time.perf_counter() - clock
+
+    issues: List[Issue] = []
+    for rule in rules:
+        if rule in METRIC_RULES:
+            continue
+        clock = time.perf_counter()
+        found = rule(rel, scan)
+        if profile:
+            seconds[rule.__name__] = time.perf_counter() - clock
+        for issue in found:
+            issue.rule = rule_id(rule)
+        issues.extend(found)
+
+    clock = time.perf_counter()
+    sf, sl = check_stateful_ratio(rel, scan) if check_stateful_ratio in rules else (0, 0)
+    if profile:
+        seconds["check_stateful_ratio"] = time.perf_counter() - clock
+        clock = time.perf_counter()
+    const, missing = check_const_coverage(rel, scan) if check_const_coverage in rules else (0, [])
+    if profile:
+        seconds["check_const_coverage"] = time.perf_counter() - clock
+        clock = time.perf_counter()
+    colors = check_color_usage(rel, scan) if check_color_usage in rules else {}
+    if profile:
+        seconds["check_color_usage"] = time.perf_counter() - clock
+        clock = time.perf_counter()
+    theme = check_app_theme(rel, scan) if check_app_theme in rules else 0
+    if not profile:
+        return FileResult(rel, digest, issues, sf, sl, None, const, missing, colors, imports, theme)
+    seconds["check_app_theme"] = time.perf_counter() - clock
+    return FileResult(rel, digest, issues, sf, sl,
+                      {"bytes": len(data), "lines": len(scan.lines), "seconds": seconds},
+                      const, missing, colors, imports, theme)
+
+
+def _analyse_one(file: Path, known_digest: Optional[str], project_path: Path,
+                 profile: bool = False) -> FileResult:
+    """analyse_file() with the digest second, so pool.map can zip files and digests."""
+    return analyse_file(file, project_path, known_digest, profile)
+
+
+def _pool_map(worker, jobs: int, files: List[Path], *more: list):
+    """map(worker, files, *more), in order — in a process pool when worthwhile."""
+    if jobs > 1 and len(files) >= PARALLEL_MIN_FILES:
+        try:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+        except (OSError, NotImplementedError):
+            pool = None  # No working multiprocessing here — scan serially.
+        if pool is not None:
+            chunksize = max(1, len(files) // (jobs * 4))
+            with pool:
+                yield from pool.map(worker, files, *more, chunksize=chunksize)
+            return
+    yield from map(worker, files, *more)
+
+
+def _run_files(files: List[Path], digests: List[Optional[str]], project_path: Path, jobs: int,
+               profile: bool = False):
+    """analyse_file() over `files`, in order — in a process pool when worthwhile."""
+    worker = partial(_analyse_one, project_path=project_path, profile=profile)
+    yield from _pool_map(worker, jobs, files, digests)
+
+
+def iter_file_results(dart_files: List[Path], project_path: Path, jobs: int = 1,
+                      cache: Optional["AnalysisCache"] = None, profile: bool = False):
+    """Yield a FileResult per file, in `dart_files` order.
+
+    Files the cache can vouch for are not read at all; the rest go through
+    _run_files(), whose results come back in input order, so the report is
+    the same for any --jobs and for cold or warm caches. Cached results are
+    only materialised when their turn comes, so nothing piles up here.
+    """
+    plan = []
+    todo: List[Path] = []
+    digests: List[Optional[str]] = []
+    for file in dart_files:
+        rel = str(file.relative_to(project_path))
+        try:
+            st = file.stat()
+        except OSError:
+            st = None
+        hit = bool(cache and st and cache.is_fresh(rel, st))
+        if not hit:
+            todo.append(file)
+            digests.append(cache.digest(rel) if cache else None)
+        plan.append((rel, st, hit))
+
+    fresh = _run_files(todo, digests, project_path, jobs, profile)
+    for rel, st, hit in plan:
+        if hit:
+            result = cache.lookup(rel)
+        else:
+            result = next(fresh)
+            if cache and st:
+                result = cache.store(rel, st, result)
+        yield result
+
+    if cache:
+        cache.save()
+
+
+class RunProfile:
+    """--profile totals: time and calls per stage, the slowest files, throughput.
+
+    Stages are "find_dart_files" (discovery), "read_file" (read, hash and
+    decode), "lexer" (mask_dart + ScopeIndex) and one per check_* rule.
+    """
+
+    def __init__(self, top: int = 10):
+        self.top     = top
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}    # name -> [seconds, calls]
+        self.slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, file)
+        self.files = self.cached = self.bytes = self.lines = 0
+
+    def stage(self, name: str, seconds: float, calls: int = 1):
+        total = self.stages.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += calls
+
+    def add(self, result: FileResult):
+        if result.profile is None:
+            self.cached += 1        # Reused from the cache: nothing was run.
+            return
+        self.files += 1
+        self.bytes += result.profile["bytes"]
+        self.lines += result.profile["lines"]
+        seconds = result.profile["seconds"]
+        for name, s in seconds.items():
+            self.stage(name, s)
+        entry = (sum(seconds.values()), result.file)
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    def watch(self, results):
+        """Pass FileResults through, adding each to the totals."""
+        for result in results:
+            self.add(result)
+            yield result
+
+    def to_dict(self) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            "wall_seconds": round(wall, 4),
+            "files_analysed": self.files,
+            "files_cached": self.cached,
+            "bytes_per_second": round(self.bytes / wall) if wall else 0,
+            "lines_per_second": round(self.lines / wall) if wall else 0,
+            "stages": {name: {"seconds": round(s, 4), "calls": calls}
+                       for name, (s, calls) in sorted(self.stages.items(), key=lambda kv: -kv[1][0])},
+            "slowest_files": [{"file": f, "seconds": round(s, 4)}
+                              for s, f in sorted(self.slowest, reverse=True)],
+        }
+
+    def print_table(self):
+        data = self.to_dict()
+        print(f"\n{bold('⏱️  Profile')}")
+        print(f"  {data['files_analysed']} files analysed, {data['files_cached']} from cache, "
+              f"{data['wall_seconds']:.2f}s wall — "
+              f"{data['bytes_per_second'] / 1e6:.1f} MB/s, {data['lines_per_second']:,} lines/s\n")
+        print(f"  {'Stage':<28}{'seconds':>10}{'calls':>8}")
+        for name, stage in data["stages"].items():
+            print(f"  {name:<28}{stage['seconds']:>10.3f}{stage['calls']:>8}")
+        if data["slowest_files"]:
+            print("\n  Slowest files:")
+            for entry in data["slowest_files"]:
+                print(f"  {entry['seconds']:>8.3f}s  {entry['file']}")
+
+
+# ─── Result Cache ─────────────────────────────────────────────────────────────
+CACHE_DIR    = Path(".dart_tool") / "flutter_ai_ui_cache"
+CACHE_FORMAT = 5
+
+
+def ruleset_version() -> str:
+    """Hash of the analyser source and the knowledge-base tables its rules
+    read, so any rule, palette or animation budget change invalidates
+    cached results."""
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    for table in ("colors", "animations"):
+        try:
+            digest.update((knowledge_base.DATA_DIR / knowledge_base.SOURCES[table]).read_bytes())
+        except OSError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+class AnalysisCache:
+    """Per-file results from earlier runs, kept in <project>/.dart_tool.
+
+    An entry is trusted outright while the file's size and mtime match. If
+    they changed, the file is re-read and only re-checked when its content
+    hash differs too (e.g. a branch switch that rewrote identical files).
+    """
+
+    def __init__(self, project_path: Path):
+        self.path    = project_path / CACHE_DIR / "results.json"
+        self.ruleset = ruleset_version()
+        self.entries: Dict[str, list] = {}
+        self.current: Dict[str, list] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("format") == CACHE_FORMAT and data.get("ruleset") == self.ruleset:
+            self.entries = data.get("files", {})
+
+    # Entry layout: [size, mtime_ns, digest, stateful, stateless,
+    #                [[rule, severity, category, line, message, suggestion], ...],
+    #                const calls, [line of each call that could be const],
+    #                [[argb, uses], ...], [import/export/part URI, ...], theme bits]
+    # The URIs make this file the persisted import graph of the project.
+    def is_fresh(self, rel: str, st: os.stat_result) -> bool:
+        entry = self.entries.get(rel)
+        return entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+
+    def lookup(self, rel: str) -> FileResult:
+        """The cached result of a file is_fresh() accepted."""
+        entry = self.current[rel] = self.entries[rel]
+        return self._result(rel, entry)
+
+    def digest(self, rel: str) -> Optional[str]:
+        entry = self.entries.get(rel)
+        return entry[2] if entry else None
+
+    def store(self, rel: str, st: os.stat_result, result: FileResult) -> FileResult:
+        """Record a freshly analysed file; returns the result to report."""
+        if result.issues is None:
+            # Content unchanged since it was cached: only the stat moved.
+            entry = list(self.entries[rel])
+            entry[0], entry[1] = st.st_size, st.st_mtime_ns
+            self.current[rel] = entry
+            return self._result(rel, entry)
+        self.current[rel] = [
+            st.st_size, st.st_mtime_ns, result.digest, result.stateful, result.stateless,
+            [[i.rule, i.severity, i.category, i.line, i.message, i.suggestion] for i in result.issues],
+            result.const_calls, result.const_missing, list(result.colors.items()),
+            result.imports, result.theme,
+        ]
+        return result
+
+    def forget(self, rel: str):
+        """Drop a file that was deleted while the cache was in use."""
+        self.current.pop(rel, None)
+
+    def save(self):
+        """Write back the entries seen this run (dropping deleted files)."""
+        data = {"format": CACHE_FORMAT, "ruleset": self.ruleset, "files": self.current}
+        tmp = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A private temp file per run: a hook and --watch may save at once.
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps(data, separators=(",", ":")))
+            os.replace(tmp, self.path)
+        except OSError:
+            # Read-only checkout: run uncached next time, never fail the audit.
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _result(rel: str, entry: list) -> FileResult:
+        issues = [Issue(sev, cat, rel, line, msg, sugg, rule)
+                  for rule, sev, cat, line, msg, sugg in entry[5]]
+        return FileResult(rel, entry[2], issues, entry[3], entry[4], None, entry[6], entry[7],
+                          dict(entry[8]), entry[9], entry[10])
+
+
+# ─── Const Coverage ───────────────────────────────────────────────────────────
+# The text report and the NDJSON / SARIF summary carry the project's const
+# coverage (const calls over calls that are or could be const) and its
+# least-const files; the summary also has every file's ratio. --json stays
+# a bare array of issues. With
+# --const-threshold, each call that could be const in a file below that
+# coverage is reported as an issue as well. Those issues are made here, not
+# by the rule, so a cached result serves any threshold.
+CONST_WORST_FILES = 5
+
+
+def const_coverage(const: int, missing: int) -> Optional[float]:
+    """Share of const-able calls that are const, or None without any."""
+    total = const + missing
+    return const / total if total else None
+
+
+def with_const_issues(results, threshold: float):
+    """`results` plus a LOW issue for each line holding a call that could be
+    const, in files whose const coverage is under `threshold` percent."""
+    for result in results:
+        coverage = const_coverage(result.const_calls, len(result.const_missing))
+        if coverage is None or coverage * 100 >= threshold:
+            yield result
+            continue
+        found = [Issue(
+            severity="LOW", category="Performance",
+            file=result.file, line=line,
+            message=f"Constructor call could be const (file const coverage {coverage:.0%})",
+            suggestion="Prefix it with const: const widgets are built once and skipped on every rebuild.",
+            rule="const_coverage",
+        ) for line in sorted(set(result.const_missing))]
+        yield result.with_issues(result.issues + found)
+
+
+class ConstTotals:
+    """Project const coverage, summed one FileResult at a time, with the
+    (const, missing) counts of every file that has const-able calls."""
+
+    def __init__(self):
+        self.const   = 0
+        self.missing = 0
+        self.files: List[Tuple[str, int, int]] = []   # (file, const, missing)
+
+    def add(self, result: FileResult):
+        missing = len(result.const_missing)
+        self.const   += result.const_calls
+        self.missing += missing
+        if result.const_calls or missing:
+            self.files.append((result.file, result.const_calls, missing))
+
+    @property
+    def coverage(self) -> Optional[float]:
+        return const_coverage(self.const, self.missing)
+
+    @staticmethod
+    def _entry(file: str, const: int, missing: int) -> dict:
+        return {"file": file, "const": const, "candidates": const + missing,
+                "coverage": round(const_coverage(const, missing), 4)}
+
+    def worst(self) -> List[dict]:
+        """The CONST_WORST_FILES least-const files (with a call missing const), least first."""
+        worst = heapq.nsmallest(CONST_WORST_FILES, (f for f in self.files if f[2]),
+                                key=lambda f: (const_coverage(f[1], f[2]), -f[2], f[0]))
+        return [self._entry(*f) for f in worst]
+
+    def to_dict(self) -> dict:
+        coverage = self.coverage
+        return {"const": self.const, "candidates": self.const + self.missing,
+                "coverage": None if coverage is None else round(coverage, 4),
+                "worst_files": self.worst(),
+                "files": [self._entry(*f) for f in self.files]}
+
+
+# ─── Colour Usage ─────────────────────────────────────────────────────────────
+# The text report and the NDJSON / SARIF summary (not --json, a bare array
+# of issues) list the distinct hardcoded colours of the project, most used
+# first, each with the palette colour and ColorScheme role it is closest
+# to. Palette lookups are made once per distinct value.
+COLOR_TOP = 10
+
+
+class ColorTotals:
+    """Uses of each distinct Color(0x...) value, summed one FileResult at a time."""
+
+    def __init__(self):
+        self.uses: Counter = Counter()
+
+    def add(self, result: FileResult):
+        self.uses.update(result.colors)
+
+    def to_list(self, limit: Optional[int] = None) -> List[dict]:
+        """Distinct colours, most used first, with their nearest palette colour."""
+        ranked = sorted(self.uses.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        nearest = palette_index().nearest_many(argb for argb, _ in ranked)
+        out = []
+        for argb, uses in ranked:
+            entry = {"color": f"#{argb:08X}", "uses": uses}
+            alpha = argb >> 24
+            found = nearest[argb] if alpha else None
+            if found:
+                color, delta = found
+                entry.update(role=color.role, dark=color.dark, palette=color.palette,
+                             palette_color=f"#{color.rgb:06X}", delta_e=round(delta, 2))
+                if alpha < 0xFF:
+                    entry["alpha"] = round(alpha / 255, 2)  # palette colours are opaque
+            out.append(entry)
+        return out
+
+    def to_dict(self) -> dict:
+        """Totals plus the COLOR_TOP most used values."""
+        return {"distinct": len(self.uses), "literals": sum(self.uses.values()),
+                "values": self.to_list(COLOR_TOP)}
+
+
+# ─── Import Graph ─────────────────────────────────────────────────────────────
+# analyse_file reads each file's import/export/part URIs in the same pass as
+# its rules, and the cache keeps them with the rest of the result, so a warm
+# run has the graph of the audited files without reading any of them.
+# Rules about the app as a whole (check_dark_theme) run on the graph after
+# the per-file pass, so a cached file is re-judged whenever anything it
+# imports changes. The text report and the NDJSON / SARIF summary (not
+# --json) also list the files with the largest transitive fan-in: editing
+# one invalidates everything that imports it.
+FAN_IN_TOP = 5
+_DIRECTIVE_RE = re.compile(rb'^[ \t]*(?:import|export|part)[ \t]+[\'"]([^\'"\r\n]+)[\'"]', re.M)
+_PACKAGE_NAME_RE = re.compile(r'^name:\s*[\'"]?([\w]+)', re.M)
+
+
+def dart_directives(data) -> List[str]:
+    """URIs of the import, export and part directives in a file's raw bytes
+    (bytes or mmap), except dart: libraries.
+
+    Directives come before every declaration, so only the text up to the
+    first brace outside a comment line is searched.
+    """
+    end = data.find(b"{")
+    while end != -1:
+        head = data[data.rfind(b"\n", 0, end) + 1:end].lstrip()
+        if not head.startswith((b"//", b"/*", b"*")):
+            break
+        end = data.find(b"{", end + 1)
+    uris = _DIRECTIVE_RE.findall(data, 0, len(data) if end == -1 else end)
+    return [uri.decode("utf-8", "replace") for uri in uris if not uri.startswith(b"dart:")]
+
+
+def package_name(package: Path) -> Optional[str]:
+    """The name: in a package's pubspec.yaml, if it has one."""
+    try:
+        match = _PACKAGE_NAME_RE.search((package / "pubspec.yaml").read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError):
+        return None
+    return match.group(1) if match else None
+
+
+def _components(succ: List[List[int]]) -> List[List[int]]:
+    """Strongly connected components of a graph (Tarjan, iteratively), each
+    listed after every component it reaches."""
+    n = len(succ)
+    index, low, on_stack = [-1] * n, [0] * n, [False] * n
+    stack: List[int] = []
+    out: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            v, i = work[-1]
+            if i < len(succ[v]):
+                work[-1] = (v, i + 1)
+                w = succ[v][i]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, 0))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                out.append(component)
+    return out
+
+
+class ImportGraph:
+    """The audited files and the audited files each one imports, exports or
+    includes as a part, built one FileResult at a time.
+
+    Files are keyed by their POSIX path relative to the project. package:
+    URIs resolve to the lib/ of the package whose pubspec.yaml has that name;
+    imports of files outside the audit (other packages, dart:) are dropped.
+    """
+
+    def __init__(self, project_path: Path):
+        self.root = project_path
+        self.uris: Dict[str, List[str]] = {}
+        self.theme: Dict[str, int] = {}
+        self.libs: Dict[str, str] = {}        # package name -> its lib/ directory
+        self._lib_dirs: Set[str] = set()
+        self._edges: Optional[Dict[str, List[str]]] = None
+        self._importers: Optional[Dict[str, List[str]]] = None
+
+    def add(self, result: FileResult):
+        file = Path(result.file).as_posix()
+        self.uris[file] = result.imports
+        if result.theme:
+            self.theme[file] = result.theme
+        parts = file.split("/")
+        if "lib" in parts:
+            lib = "/".join(parts[:parts.index("lib") + 1])
+            if lib not in self._lib_dirs:
+                self._lib_dirs.add(lib)
+                name = package_name((self.root / lib).parent)
+                if name:
+                    self.libs.setdefault(name, lib)
+        self._edges = self._importers = None
+
+    def resolve(self, file: str, uri: str) -> Optional[str]:
+        """The project path `uri` points at from `file`, if it is a project file."""
+        if uri.startswith("package:"):
+            name, _, rest = uri[len("package:"):].partition("/")
+            lib = self.libs.get(name)
+            return None if lib is None else posixpath.normpath(posixpath.join(lib, rest))
+        if ":" in uri:
+            return None
+        return posixpath.normpath(posixpath.join(posixpath.dirname(file), uri))
+
+    @property
+    def edges(self) -> Dict[str, List[str]]:
+        """File -> the audited files it depends on directly."""
+        if self._edges is None:
+            self._edges = {}
+            for file, uris in self.uris.items():
+                targets = self._edges[file] = []
+                for uri in uris:
+                    target = self.resolve(file, uri)
+                    if target in self.uris and target != file and target not in targets:
+                        targets.append(target)
+        return self._edges
+
+    @property
+    def importers(self) -> Dict[str, List[str]]:
+        """File -> the audited files that depend on it directly."""
+        if self._importers is None:
+            self._importers = {file: [] for file in self.uris}
+            for file, targets in self.edges.items():
+                for target in targets:
+                    self._importers[target].append(file)
+        return self._importers
+
+    @staticmethod
+    def _reach(files, adjacency: Dict[str, List[str]]) -> Set[str]:
+        seen = set(files)
+        queue = list(seen)
+        while queue:
+            for other in adjacency.get(queue.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        return seen
+
+    def imported_by(self, files) -> Set[str]:
+        """`files` and every audited file they transitively depend on."""
+        return self._reach(files, self.edges)
+
+    def dependents(self, files) -> Set[str]:
+        """Audited files that transitively depend on any of `files`, besides them."""
+        files = set(files)
+        return self._reach(files, self.importers) - files
+
+    def fan_in(self) -> Dict[str, int]:
+        """Number of audited files that transitively depend on each file.
+
+        One pass over the strongly connected components, sources first,
+        carrying each component's dependents as an int bitset.
+        """
+        files = list(self.edges)
+        position = {file: i for i, file in enumerate(files)}
+        succ = [[position[t] for t in self.edges[file]] for file in files]
+        components = _components(succ)
+        owner = [0] * len(files)
+        members = [0] * len(components)
+        for c, component in enumerate(components):
+            for v in component:
+                owner[v] = c
+                members[c] |= 1 << v
+        above = [0] * len(components)
+        for c in range(len(components) - 1, -1, -1):
+            own = above[c] | members[c]
+            for v in components[c]:
+                for w in succ[v]:
+                    if owner[w] != c:
+                        above[owner[w]] |= own
+        return {file: bin(above[owner[v]] | members[owner[v]]).count("1") - 1
+                for v, file in enumerate(files)}
+
+    def to_list(self, limit: Optional[int] = None) -> List[dict]:
+        """Files with any dependents, most depended on first."""
+        counts = self.fan_in()
+        ranked = sorted((item for item in counts.items() if item[1]),
+                        key=lambda kv: (-kv[1], kv[0]))[:limit]
+        total = len(self.uris)
+        return [{"file": file, "dependents": n, "importers": len(self.importers[file]),
+                 "share": round(n / total, 4)} for file, n in ranked]
+
+    @property
+    def edge_count(self) -> int:
+        return sum(map(len, self.edges.values()))
+
+    def to_dict(self) -> dict:
+        return {"files": len(self.uris), "edges": self.edge_count,
+                "fan_in": self.to_list(FAN_IN_TOP)}
+
+
+def check_dark_theme(graph: ImportGraph) -> List[Issue]:
+    """A MaterialApp with a theme but no darkTheme, pointing at the dark
+    theme the app already builds in one of its imports if there is one."""
+    issues = []
+    for file, bits in sorted(graph.theme.items()):
+        if not bits & APP_WITHOUT_DARK_THEME:
+            continue
+        dark = sorted(f for f in graph.imported_by([file])
+                      if graph.theme.get(f, 0) & DEFINES_DARK_THEME)
+        if file in dark:
+            dark.remove(file)
+            dark.insert(0, file)
+        suggestion = ("Add darkTheme: ThemeData(brightness: Brightness.dark, colorScheme: "
+                      "ColorScheme.fromSeed(..., brightness: Brightness.dark)) to MaterialApp.")
+        if dark:
+            suggestion = (f"{Path(dark[0])} already builds a dark theme: pass it to MaterialApp "
+                          "as darkTheme: (with themeMode: ThemeMode.system).")
+        issues.append(Issue(
+            severity="HIGH", category="Theming",
+            file=str(Path(file)), line=None,
+            message="MaterialApp found without darkTheme",
+            suggestion=suggestion, rule=rule_id(check_dark_theme),
+        ))
+    return issues
+
+
+# ─── Duplicate Subtrees ───────────────────────────────────────────────────────
+# --duplicates finds constructor-call subtrees repeated across the audited
+# files. Subtrees are compared as token streams in which variables become
+# "_" and numbers "0" (string contents are already blank in the masked
+# code), keeping type names, named-argument labels and keywords. One pass
+# per file builds prefix hashes of that stream (a polynomial rolling hash),
+# so every subtree is hashed in O(1) and the whole project is grouped by
+# hash in one dict: linear in the size of the code, with no pairwise
+# comparison. The pass is not cached: it reads and lexes every audited file
+# on each run, warm cache or not, since the hashes depend on MIN_TOKENS.
+DUPLICATE_MIN_TOKENS = 40    # default --duplicates size threshold
+DUPLICATE_MAX_PLACES = 10    # locations listed in one issue
+_SUBTREE_TOKEN_RE = re.compile(r'([A-Z][\w$]*)|([a-z_$][\w$]*)(\s*:(?!:))?|(\d[\w.]*)|(\S)')
+_SUBTREE_KEYWORDS = frozenset(("const", "new", "true", "false", "null", "this", "super",
+                               "if", "else", "for", "in", "is", "as"))
+_CONSTRUCTOR_CALL_RE = re.compile(r'[A-Z][\w$]*(?:\.[\w$]+)?\s*(?:<[^;{}()]*>\s*)?\(')
+_HASH_MOD  = (1 << 61) - 1
+_HASH_BASE = 0x5BD1E995
+_TOKEN_VALUES: Dict[str, int] = {}
+
+
+def _token_value(token: str) -> int:
+    """Hash of one normalised token, the same in every process."""
+    value = _TOKEN_VALUES.get(token)
+    if value is None:
+        value = _TOKEN_VALUES[token] = int.from_bytes(
+            hashlib.blake2b(token.encode(), digest_size=8).digest(), "big") % _HASH_MOD
+    return value
+
+
+def widget_subtrees(scan: SourceScan, min_tokens: int) -> List[Tuple[int, int, int, int]]:
+    """(key, tokens, line, parent) of every constructor call spanning at
+    least `min_tokens` normalised tokens, in file order.
+
+    `key` hashes the call's normalised tokens and their count; `parent` is
+    the key of the innermost such call holding this one, or -1.
+    """
+    code = scan.code
+    offsets: List[int] = []
+    prefix = [0]
+    append_offset, append_prefix = offsets.append, prefix.append
+    value = _TOKEN_VALUES.get
+    h = 0
+    for m in _SUBTREE_TOKEN_RE.finditer(code):
+        kind, ident, label, number, other = m.groups()
+        if kind:
+            token = kind
+        elif ident:
+            token = ident + ":" if label else ident if ident in _SUBTREE_KEYWORDS else "_"
+        else:
+            token = "0" if number else other
+        v = value(token)
+        if v is None:
+            v = _token_value(token)
+        h = (h * _HASH_BASE + v) % _HASH_MOD
+        append_offset(m.start())
+        append_prefix(h)
+    if len(offsets) < min_tokens:
+        return []
+
+    pairs = scan.pairs
+    powers = [1] * (len(offsets) + 1)
+    for i in range(1, len(powers)):
+        powers[i] = powers[i - 1] * _HASH_BASE % _HASH_MOD
+
+    found: List[Tuple[int, int, int, int]] = []
+    open_calls: List[Tuple[int, int]] = []   # (close offset, key) of enclosing calls
+    line_no, last = 1, 0
+    for m in _CONSTRUCTOR_CALL_RE.finditer(code):
+        head = m.start()
+        if head and code[head - 1] in _WORD_OR_DOT:
+            continue
+        close = pairs.get(m.end() - 1, len(code))
+        if close >= len(code):
+            continue
+        first = bisect_left(offsets, head)
+        end = bisect_right(offsets, close)
+        count = end - first
+        if count < min_tokens:
+            continue
+        while open_calls and open_calls[-1][0] < head:
+            open_calls.pop()
+        key = ((prefix[end] - prefix[first] * powers[count]) * _HASH_BASE + count) % _HASH_MOD
+        line_no += code.count('\n', last, head)
+        last = head
+        found.append((key, count, line_no, open_calls[-1][1] if open_calls else -1))
+        open_calls.append((close, key))
+    return found
+
+
+def _file_subtrees(file: Path, project_path: Path, min_tokens: int):
+    """(relative path, widget_subtrees()) of one file."""
+    return str(file.relative_to(project_path)), widget_subtrees(SourceScan(read_file(file)), min_tokens)
+
+
+def find_duplicate_subtrees(files: List[Path], project_path: Path, min_tokens: int,
+                            jobs: int = 1) -> List[Issue]:
+    """One issue per subtree of at least `min_tokens` tokens found in more
+    than one place, biggest saving first.
+
+    A repeated subtree is left out when every copy sits in a copy of the
+    same repeated parent: the parent's issue already covers it.
+    """
+    # key -> [tokens, [(file, line), ...], common parent key or None if mixed]
+    groups: Dict[int, list] = {}
+    worker = partial(_file_subtrees, project_path=project_path, min_tokens=min_tokens)
+    for rel, subtrees in _pool_map(worker, jobs, files):
+        for key, count, line, parent in subtrees:
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [count, [(rel, line)], parent]
+            else:
+                group[1].append((rel, line))
+                if group[2] != parent:
+                    group[2] = None
+
+    issues = []
+    repeated = [(key, group) for key, group in groups.items() if len(group[1]) > 1]
+    repeated.sort(key=lambda kv: (-kv[1][0] * (len(kv[1][1]) - 1), kv[1][1][0]))
+    for key, (count, places, parent) in repeated:
+        enclosing = groups.get(parent) if parent is not None else None
+        if enclosing is not None and len(enclosing[1]) > 1:
+            continue
+        others = ", ".join(f"{file}:{line}" for file, line in places[1:DUPLICATE_MAX_PLACES])
+        if len(places) > DUPLICATE_MAX_PLACES:
+            others += f" (+{len(places) - DUPLICATE_MAX_PLACES} more)"
+        issues.append(Issue(
+            severity="LOW", category="Widgets",
+            file=places[0][0], line=places[0][1],
+            message=f"Widget subtree of {count} tokens repeated in {len(places)} places",
+            suggestion=f"Extract it into a StatelessWidget with a const constructor and reuse it. Also at {others}.",
+            rule="duplicate_subtrees",
+        ))
+    return issues
+
+
+# ─── Streaming Output ─────────────────────────────────────────────────────────
+# --format ndjson / sarif write each file's issues as soon as the file has
+# been checked and keep only running totals, so memory stays flat however
+# many issues a run finds. Issues come out in file order, not by severity.
+SARIF_LEVELS = {"CRITICAL": "error", "HIGH": "error", "MEDIUM": "warning", "LOW": "note"}
+# One fixed shortDescription per rule id; what a single hit found (the colour,
+# the line count, the widget) stays in that result's message.
+SARIF_RULES = {
+    "hardcoded_colors":        "Hardcoded Color(0x...) literal instead of a theme colour",
+    "large_build_methods":     "build() method longer than 60 lines",
+    "missing_semantics":       "Image widgets without a semanticsLabel or Semantics wrapper",
+    "listview_usage":          "ListView(children: ...) instead of ListView.builder",
+    "setstate_in_build":       "setState() called inside build()",
+    "context_after_async":     "BuildContext used after an async gap without a mounted check",
+    "cached_images":           "Image.network() used without caching",
+    "material3":               "ThemeData without useMaterial3: true",
+    "opacity_widgets":         "Opacity widget that paints its child into an offscreen layer",
+    "savelayer_in_list_items": "ClipRRect / BackdropFilter / ShaderMask inside a list itemBuilder",
+    "mediaquery_of":           "MediaQuery.of(context) where a narrower accessor rebuilds less",
+    "large_children":          "Children built up front instead of lazily, or a very long children: list",
+    "image_decode_size":       "CachedNetworkImage decoded at full resolution",
+    "nested_shrinkwrap":       "shrinkWrap: true scrollable nested in another scrollable",
+    "animation_timing":        "Animation duration longer than data/flutter_animations.csv recommends",
+    "animation_rebuilds":      "Animation that rebuilds a whole subtree on every frame",
+    "pubspec":                 "Recommended package missing from pubspec.yaml",
+    "dark_theme":              "MaterialApp without a darkTheme",
+    "const_coverage":          "Constructor call that could be const",
+    "duplicate_subtrees":      "Widget subtree repeated across the project",
+}
+
+
+class NdjsonWriter:
+    """One issue object per line, then a {"summary": {...}} trailer line."""
+
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, issues: List[Issue]):
+        self.out.write(''.join(json.dumps(i.to_dict()) + "\n" for i in issues))
+        self.out.flush()
+
+    def close(self, summary: dict):
+        self.out.write(json.dumps({"summary": summary}) + "\n")
+        self.out.flush()
+
+
+class SarifWriter:
+    """A SARIF 2.1.0 log with a single run, written result by result.
+
+    The run's `results` array is opened first; `tool` (with the rules that
+    actually fired) and the totals in `properties` are written after it.
+    """
+
+    def __init__(self, out):
+        self.out   = out
+        self.rules: Dict[str, str] = {}   # rule id -> first message (if not in SARIF_RULES)
+        self.first = True
+        out.write('{"version": "2.1.0", '
+                  '"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+                  '"runs": [{"results": [\n')
+
+    def write(self, issues: List[Issue]):
+        parts = []
+        for issue in issues:
+            self.rules.setdefault(issue.rule, issue.message)
+            location = {"artifactLocation": {"uri": Path(issue.file).as_posix(), "uriBaseId": "%SRCROOT%"}}
+            if issue.line:
+                location["region"] = {"startLine": issue.line}
+            parts.append(json.dumps({
+                "ruleId": issue.rule,
+                "level": SARIF_LEVELS.get(issue.severity, "warning"),
+                "message": {"text": issue.message},
+                "locations": [{"physicalLocation": location}],
+                "properties": {"severity": issue.severity, "category": issue.category,
+                               "suggestion": issue.suggestion},
+            }))
+        if parts:
+            self.out.write(("" if self.first else ",\n") + ",\n".join(parts))
+            self.first = False
+            self.out.flush()
+
+    def close(self, summary: dict):
+        driver = {
+            "name": "flutter-ai-ui-audit",
+            "informationUri": "https://github.com/SpeakQuery/flutter-ai-ui-skill",
+            "rules": [{"id": rule, "shortDescription": {"text": SARIF_RULES.get(rule, text)}}
+                      for rule, text in sorted(self.rules.items())],
+        }
+        self.out.write("\n], " + json.dumps({"tool": {"driver": driver}, "properties": summary})[1:-1] + "}]}\n")
+        self.out.flush()
+
+
+STREAM_WRITERS = {"ndjson": NdjsonWriter, "sarif": SarifWriter}
+
+
+# ─── Git Scope ────────────────────────────────────────────────────────────────
+# --changed-since REF audits only what a branch touched: the file list (and
+# with --hunks-only the changed line ranges) comes from a single `git diff`
+# over the whole tree rather than one git call per file.
+_HUNK_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@', re.M)
+
+
+def _git(path: Path, *args: str) -> str:
+    try:
+        proc = subprocess.run(["git", "-c", "core.quotePath=false", "-C", str(path)] + list(args),
+                              capture_output=True, text=True, encoding="utf-8", errors="replace")
+    except OSError:
+        print(red("ERROR: git is required for --changed-since"))
+        sys.exit(1)
+    if proc.returncode != 0:
+        print(red(f"ERROR: git {args[0]} failed: {proc.stderr.strip()}"))
+        sys.exit(1)
+    return proc.stdout
+
+
+def git_changed_files(path: Path, ref: str) -> Set[Path]:
+    """Files under `path` that differ from `ref` and still exist."""
+    out = _git(path, "diff", "--name-only", "-z", "--relative", "--diff-filter=d", ref, "--")
+    return {path / name for name in out.split("\0") if name}
+
+
+def git_changed_lines(path: Path, ref: str) -> Dict[Path, List[Tuple[int, int]]]:
+    """Added/modified line ranges (first, last) of each file changed since `ref`.
+
+    The a/ b/ prefixes are pinned, so diff.noprefix / diff.mnemonicPrefix in
+    the user's config cannot hide the headers, and the files found are
+    checked against `git diff --name-only`.
+    """
+    out = _git(path, "diff", "-U0", "--relative", "--diff-filter=d", "--no-color",
+               "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/", ref, "--")
+    changed: Dict[Path, List[Tuple[int, int]]] = {}
+    ranges: List[Tuple[int, int]] = []
+    for line in out.splitlines():
+        if line.startswith("+++ "):
+            name = line[4:].rstrip("\t")   # git tab-terminates names with spaces
+            if name.startswith('"'):      # C-quoted: control characters, '"' or '\\'
+                name = codecs.escape_decode(name[1:-1].encode())[0].decode("utf-8", "replace")
+            if not name.startswith("b/"):
+                print(red(f"ERROR: unexpected git diff header: {line}"))
+                sys.exit(1)
+            ranges = changed.setdefault(path / name[2:], [])
+        elif line.startswith("@@"):
+            m = _HUNK_RE.match(line)
+            if m:
+                start, count = int(m.group(1)), int(m.group(2) or 1)
+                if count:
+                    ranges.append((start, start + count - 1))
+    files = git_changed_files(path, ref)
+    if not set(changed) <= files:
+        print(red("ERROR: git diff hunks name files that git diff --name-only does not list"))
+        sys.exit(1)
+    for file in files - set(changed):
+        changed[file] = []   # binary or mode-only change: no text hunks
+    return changed
+
+
+def in_hunks(result: FileResult, ranges: List[Tuple[int, int]]) -> FileResult:
+    """`result` keeping file-level issues and line issues inside `ranges`."""
+    starts = [first for first, _ in ranges]
+    kept = []
+    for issue in result.issues:
+        if issue.line is not None:
+            i = bisect_right(starts, issue.line) - 1
+            if i < 0 or issue.line > ranges[i][1]:
+                continue
+        kept.append(issue)
+    return result.with_issues(kept)
+
+
+# ─── Issue Database ───────────────────────────────────────────────────────────
+# --store keeps the latest run's issues in a SQLite file, as integer columns
+# over an interned string table (like IssueStore) indexed by file, rule,
+# severity / category and fingerprint. A fingerprint hashes the rule, the
+# file and the issue's line with whitespace collapsed (the message for
+# file-level issues), plus its occurrence number among identical keys, into
+# a 64-bit integer, so it survives edits that only shift lines. The
+# baseline (--save-baseline) is just the set of a run's fingerprints;
+# --baseline reports only issues outside it, and --from-store answers
+# severity / category queries from the file without scanning the project.
+STORE_FILE   = CACHE_DIR / "issues.sqlite"
+STORE_FORMAT = 1
+_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    kind    TEXT PRIMARY KEY,          -- 'latest' or 'baseline'
+    project TEXT NOT NULL,
+    started REAL NOT NULL,
+    issues  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS issues (
+    fingerprint INTEGER NOT NULL,
+    file        INTEGER NOT NULL,
+    line        INTEGER,
+    rule        INTEGER,
+    severity    INTEGER NOT NULL,
+    category    INTEGER NOT NULL,
+    message     INTEGER NOT NULL,
+    suggestion  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_file        ON issues(file);
+CREATE INDEX IF NOT EXISTS issues_rule        ON issues(rule);
+CREATE INDEX IF NOT EXISTS issues_severity    ON issues(severity, category);
+CREATE INDEX IF NOT EXISTS issues_fingerprint ON issues(fingerprint);
+CREATE TABLE IF NOT EXISTS baseline (fingerprint INTEGER PRIMARY KEY);
+"""
+
+
+class IssueDatabase:
+    """A --store file: the latest run's issues and the baseline fingerprints.
+
+    A run replaces the previous one inside a single transaction, committed
+    by close(), so an interrupted audit leaves the file as it was.
+    """
+
+    def __init__(self, path: Path, project_path: Path):
+        self.path = path
+        self.root = project_path
+        self.project = str(project_path)
+        self.known: Optional[Set[int]] = None   # baseline fingerprints, with --baseline
+        self.hidden = 0
+        self.recorded = 0
+        self.save_baseline = False
+        self.running = False
+        self._ids: Dict[str, int] = {}
+        self._new_strings: List[Tuple[int, str]] = []
+        self._occurrences: Dict[str, int] = {}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(str(path))
+            if self.db.execute("PRAGMA user_version").fetchone()[0] not in (0, STORE_FORMAT):
+                self.db.executescript("DROP TABLE IF EXISTS runs; DROP TABLE IF EXISTS strings; "
+                                      "DROP TABLE IF EXISTS issues; DROP TABLE IF EXISTS baseline;")
+            self.db.executescript(_STORE_SCHEMA + f"PRAGMA user_version = {STORE_FORMAT};")
+        except (OSError, sqlite3.Error) as e:
+            print(red(f"ERROR: Cannot open issue store {path}: {e}"))
+            sys.exit(1)
+
+    def require(self, kind: str):
+        """Exit with a hint unless a `kind` ('latest' / 'baseline') run is stored."""
+        if self.db.execute("SELECT 1 FROM runs WHERE kind = ?", (kind,)).fetchone() is None:
+            hint = "record one with --save-baseline" if kind == "baseline" else "audit with --store"
+            print(red(f"ERROR: No {kind} run in {self.path}: {hint} first"))
+            sys.exit(1)
+
+    def compare_to_baseline(self):
+        """Make record() return only issues missing from the baseline."""
+        self.require("baseline")
+        self.known = {fp for fp, in self.db.execute("SELECT fingerprint FROM baseline")}
+
+    def start(self, project: str, save_baseline: bool = False):
+        """Begin recording a run in place of the latest one."""
+        self.project = project
+        self.save_baseline = save_baseline
+        self.running = True
+        self.db.execute("DELETE FROM issues")
+        self.db.execute("DELETE FROM strings")
+
+    def _id(self, text: str) -> int:
+        i = self._ids.get(text)
+        if i is None:
+            i = self._ids[text] = len(self._ids) + 1
+            self._new_strings.append((i, text))
+        return i
+
+    def fingerprints(self, issues: List[Issue]) -> List[int]:
+        lines: Dict[str, List[str]] = {}
+        out = []
+        for issue in issues:
+            if issue.line:
+                source = lines.get(issue.file)
+                if source is None:
+                    source = lines[issue.file] = read_file(self.root / issue.file)
+                text = " ".join(source[issue.line - 1].split()) if issue.line <= len(source) else ""
+            else:
+                text = issue.message
+            key = f"{issue.rule}\0{Path(issue.file).as_posix()}\0{text}"
+            n = self._occurrences[key] = self._occurrences.get(key, 0) + 1
+            digest = hashlib.blake2b(f"{key}\0{n}".encode("utf-8"), digest_size=8).digest()
+            out.append(int.from_bytes(digest, "big", signed=True))
+        return out
+
+    def record(self, issues: List[Issue]) -> List[Issue]:
+        """Store `issues` in the current run; returns those to report."""
+        if not issues:
+            return issues
+        prints = self.fingerprints(issues)
+        self._new_strings = []
+        intern = self._id
+        rows = [(fp, intern(i.file), i.line, None if i.rule is None else intern(i.rule),
+                 intern(i.severity), intern(i.category), intern(i.message), intern(i.suggestion))
+                for fp, i in zip(prints, issues)]
+        self.db.executemany("INSERT INTO strings VALUES (?, ?)", self._new_strings)
+        self.db.executemany("INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.recorded += len(rows)
+        if self.known is None:
+            return issues
+        new = [issue for fp, issue in zip(prints, issues) if fp not in self.known]
+        self.hidden += len(issues) - len(new)
+        return new
+
+    def query(self, severities: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+              new_only: bool = False):
+        """Issues of the latest run, most severe first, in recorded order.
+
+        Only the filter values are looked up in the string table up front;
+        each row's texts come from primary-key joins.
+        """
+        wanted = [sev for sev in SEVERITIES] + (severities or []) + (categories or [])
+        ids = dict(self.db.execute(
+            f"SELECT text, id FROM strings WHERE text IN ({', '.join('?' * len(wanted))})", wanted))
+        sql = ("SELECT sev.text, cat.text, file.text, i.line, msg.text, sugg.text, rule.text "
+               "FROM issues i JOIN strings sev ON sev.id = i.severity "
+               "JOIN strings cat ON cat.id = i.category JOIN strings file ON file.id = i.file "
+               "JOIN strings msg ON msg.id = i.message JOIN strings sugg ON sugg.id = i.suggestion "
+               "LEFT JOIN strings rule ON rule.id = i.rule WHERE 1")
+        params: list = []
+        for column, values in (("severity", severities), ("category", categories)):
+            if values:
+                found = [ids[v] for v in values if v in ids] or [0]
+                sql += f" AND i.{column} IN ({', '.join('?' * len(found))})"
+                params += found
+        if new_only:
+            sql += " AND i.fingerprint NOT IN (SELECT fingerprint FROM baseline)"
+        ranks = " ".join(f"WHEN {ids[sev]} THEN {r}" for r, sev in enumerate(SEVERITIES) if sev in ids)
+        sql += f" ORDER BY CASE i.severity {ranks} ELSE {len(SEVERITIES)} END, i.rowid" if ranks else ""
+        for row in self.db.execute(sql, params):
+            yield Issue(*row)
+
+    def summary(self) -> dict:
+        out = {"store": str(self.path)}
+        if self.known is not None:
+            out["baseline_issues_hidden"] = self.hidden
+        return out
+
+    def close(self):
+        """Commit the run, if one was started (and with --save-baseline, its
+        fingerprints as the baseline)."""
+        if not self.running:
+            self.db.close()
+            return
+        row = (self.project, time.time(), self.recorded)
+        self.db.execute("INSERT OR REPLACE INTO runs VALUES ('latest', ?, ?, ?)", row)
+        if self.save_baseline:
+            self.db.execute("DELETE FROM baseline")
+            self.db.execute("INSERT OR IGNORE INTO baseline SELECT fingerprint FROM issues")
+            self.db.execute("INSERT OR REPLACE INTO runs VALUES ('baseline', ?, ?, ?)", row)
+        self.db.commit()
+        self.db.close()
+
+
+def query_store(project_path: str, store: Optional[str], output_format: str,
+                severities: Optional[List[str]], categories: Optional[List[str]], new_only: bool):
+    """--from-store: print recorded issues matching the filters, without scanning."""
+    path = Path(project_path)
+    db_path = Path(store) if store else path / STORE_FILE
+    if not db_path.is_file():
+        print(red(f"ERROR: No issue store at {db_path}: audit with --store first"))
+        sys.exit(1)
+    database = IssueDatabase(db_path, path)
+    database.require("latest")
+    if new_only:
+        database.require("baseline")
+    issues = database.query(severities, categories, new_only)
+    if output_format in STREAM_WRITERS:
+        writer = STREAM_WRITERS[output_format](sys.stdout)
+        counts = dict.fromkeys(SEVERITIES, 0)
+        for batch in iter(lambda: list(islice(issues, 4096)), []):
+            for issue in batch:
+                counts[issue.severity] = counts.get(issue.severity, 0) + 1
+            writer.write(batch)
+        writer.close({"project": project_path, "store": str(database.path),
+                      "issues": sum(counts.values()), "severity": counts})
+        database.close()
+        return
+
+    store_rows = IssueStore()
+    store_rows.extend(issues)
+    database.close()
+    rows = list(range(len(store_rows)))
+    if output_format == "json":
+        write_json_array(store_rows, rows)
+        print()
+        return
+    for row in rows:
+        print(repr(store_rows.issue(row)))
+    print(f"{bold('━' * 60)}")
+    print(f"  Total issues: {len(rows)} (from {database.path})")
+    print(f"{bold('━' * 60)}\n")
+
+
+# ─── Watch Mode ───────────────────────────────────────────────────────────────
+# --watch keeps every file's FileResult in memory and, on each batch of
+# filesystem changes, re-checks only the .dart files that changed (and the
+# pubspec step only when a pubspec.yaml changed). Changes are collected
+# until the tree has been quiet for WATCH_DEBOUNCE seconds, so a branch
+# switch touching thousands of files is re-audited once.
+WATCH_DEBOUNCE      = 0.3   # seconds of quiet that close a batch
+WATCH_POLL_INTERVAL = 1.0   # seconds between scans when inotify is unavailable
+
+
+def watched_dirs(path: Path, workspace: bool) -> List[Path]:
+    """Every directory whose entries can change the audit."""
+    if not workspace:
+        return [path] + [Path(d) for d, _, _ in os.walk(path / "lib")]
+    dirs = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        here = Path(dirpath)
+        dirnames[:] = _pruned(here, dirnames, "pubspec.yaml" in filenames)
+        dirs.append(here)
+    return dirs
+
+
+class InotifyWatcher:
+    """Linux inotify through ctypes, one watch per directory.
+
+    wait() returns the paths that changed, an empty set on timeout, or None
+    when the kernel queue overflowed and everything must be rescanned.
+    """
+    IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE = 0x8, 0x40, 0x80, 0x100
+    IN_DELETE, IN_DELETE_SELF, IN_MOVE_SELF = 0x200, 0x400, 0x800
+    IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+    MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT = struct.Struct("iIII")   # wd, mask, cookie, len; then the name
+
+    def __init__(self, dirs: List[Path]):
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            init, self._add = libc.inotify_init1, libc.inotify_add_watch
+        except AttributeError:
+            raise OSError("inotify is not available on this platform")
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._errno = ctypes.get_errno
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self._errno(), "inotify_init1 failed")
+        self.dirs: Dict[int, Path] = {}
+        for d in dirs:
+            self.watch(d)
+
+    def watch(self, directory: Path):
+        wd = self._add(self.fd, os.fsencode(str(directory)), self.MASK)
+        if wd < 0:
+            errno = self._errno()
+            if errno == 28:   # ENOSPC: out of watches (fs.inotify.max_user_watches)
+                raise OSError(errno, "inotify watch limit reached")
+            return            # Vanished already; its parent reports that.
+        self.dirs[wd] = directory
+
+    def wait(self, timeout: Optional[float]):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, pos)
+            name = data[pos + 16:pos + 16 + length].rstrip(b"\0")
+            pos += 16 + length
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            parent = self.dirs.get(wd)
+            if parent is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self.dirs[wd]
+                continue
+            changed.add(parent / os.fsdecode(name) if name else parent)
+        return changed
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: compares stat() snapshots."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot          # () -> {path: (size, mtime_ns)}
+        self.state = snapshot()
+
+    def watch(self, directory: Path):
+        pass                              # Every poll rescans the whole tree.
+
+    def wait(self, timeout: Optional[float]):
+        waited = 0.0
+        while True:
+            interval = WATCH_POLL_INTERVAL if timeout is None else min(timeout, WATCH_POLL_INTERVAL)
+            time.sleep(interval)
+            waited += interval
+            state = self.snapshot()
+            changed = {p for p in state.keys() | self.state.keys() if state.get(p) != self.state.get(p)}
+            self.state = state
+            if changed or (timeout is not None and waited >= timeout):
+                return changed
+
+
+def watch_project(project_path: str, path: Path, workspace: bool, include_generated: bool,
+                  jobs: int, cache: Optional[AnalysisCache], output_format: str,
+                  const_threshold: Optional[float] = None):
+    """Audit once, then re-audit what changes until interrupted."""
+    packages, dart_files = discover_project(path, workspace, include_generated)
+    results: Dict[Path, FileResult] = dict(zip(dart_files, iter_file_results(dart_files, path, jobs, cache)))
+    pubspec = {p: check_pubspec(p, path) for p in packages}
+
+    def is_source(file: Path) -> bool:
+        if not file.name.endswith(".dart") or not _dart_sources([file.name], include_generated):
+            return False
+        rel = file.relative_to(path).parts
+        if not workspace:
+            return rel[0] == "lib"
+        if any(part.startswith(".") for part in rel):
+            return False
+        return any(parent.name == "lib" and parent.parent in pubspec for parent in file.parents)
+
+    def snapshot() -> Dict[Path, Tuple[int, int]]:
+        state = {}
+        files = discover_project(path, workspace, include_generated)[1]
+        for file in files + [p / "pubspec.yaml" for p in pubspec]:
+            try:
+                st = file.stat()
+            except OSError:
+                continue
+            state[file] = (st.st_size, st.st_mtime_ns)
+        return state
+
+    try:
+        watcher = InotifyWatcher(watched_dirs(path, workspace))
+    except OSError:
+        watcher = PollingWatcher(snapshot)
+
+    def show(note: str = ""):
+        if output_format == "text" and note:
+            print(cyan(note))
+        ordered = (results[f] for f in sorted(results))
+        if const_threshold is not None:
+            ordered = with_const_issues(ordered, const_threshold)
+        report(project_path, list(pubspec), len(results), ordered,
+               [i for p in sorted(pubspec) for i in pubspec[p]], output_format, workspace)
+        if output_format == "text":
+            print(cyan(f"👀 Watching {project_path} for changes (Ctrl+C to stop)…"))
+        sys.stdout.flush()
+
+    show()
+    try:
+        while True:
+            changed = watcher.wait(None)
+            while changed is not None:
+                more = watcher.wait(WATCH_DEBOUNCE)
+                if more is None:
+                    changed = None   # The queue overflowed mid-burst: rediscover everything.
+                    break
+                if not more:
+                    break
+                changed |= more
+            started = time.monotonic()
+
+            stale: set = set()
+            recheck: set = set()
+            rediscover = changed is None
+            for p in changed or ():
+                if p.name == "pubspec.yaml":
+                    if p.is_file() != (p.parent in pubspec):
+                        rediscover = True   # A package appeared or went away.
+                    elif p.parent in pubspec:
+                        pubspec[p.parent] = check_pubspec(p.parent, path)
+                elif p.name.endswith(".dart") or not p.is_dir():
+                    if p.is_file() and is_source(p):
+                        recheck.add(p)
+                    else:
+                        # Deleted, moved away, or a directory that is gone.
+                        stale.update(f for f in results if f == p or p in f.parents)
+                elif workspace or p.relative_to(path).parts[:1] == ("lib",):
+                    # A directory was created or moved in: watch it and
+                    # pick up everything already inside it.
+                    for dirpath, dirnames, filenames in os.walk(p):
+                        here = Path(dirpath)
+                        is_package = "pubspec.yaml" in filenames
+                        rediscover |= is_package and here not in pubspec
+                        dirnames[:] = _pruned(here, dirnames, is_package)
+                        watcher.watch(here)
+                        recheck.update(f for f in (here / n for n in filenames) if is_source(f))
+
+            if rediscover:
+                # Queue overflow or a package change: walk the tree again.
+                packages, dart_files = discover_project(path, workspace, include_generated)
+                pubspec = {p: check_pubspec(p, path) for p in packages}
+                files = set(dart_files)
+                stale = set(results) - files
+                recheck = files if changed is None else (recheck | (files - set(results))) & files
+
+            for file in stale - recheck:
+                del results[file]
+                if cache:
+                    cache.forget(str(file.relative_to(path)))
+            ordered = sorted(recheck)
+            results.update(zip(ordered, iter_file_results(ordered, path, jobs, cache)))
+            # Whole-app rules are re-run on the graph by report(), so the
+            # files importing a changed one are re-judged without a re-read.
+            graph = ImportGraph(path)
+            for result in results.values():
+                graph.add(result)
+            dependents = graph.dependents(f.relative_to(path).as_posix() for f in recheck)
+
+            n = len(recheck) + len(stale - recheck)
+            show(f"\n🔁 {n} file(s) changed, {len(dependents)} importing them — "
+                 f"re-audited in {time.monotonic() - started:.2f}s")
+    except KeyboardInterrupt:
+        pass
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+def discover_project(path: Path, workspace: bool, include_generated: bool) -> Tuple[List[Path], List[Path]]:
+    """(package roots, Dart files to audit) for a project or workspace root."""
+    if workspace:
+        return find_workspace(path, include_generated)
+    return [path], find_dart_files(path, include_generated)
+
+
+def analyse_project(project_path: str, fix_suggestions: bool = False, as_json: bool = False,
+                    jobs: Optional[int] = None, use_cache: bool = True,
+                    output_format: Optional[str] = None, workspace: bool = False,
+                    include_generated: bool = False, watch: bool = False,
+                    changed_since: Optional[str] = None, hunks_only: bool = False,
+                    profile_top: Optional[int] = None, const_threshold: Optional[float] = None,
+                    duplicates: Optional[int] = None, store: Optional[str] = None,
+                    baseline: Optional[str] = None):
+    """Audit a project; `profile_top` (--profile N) adds timings and the N slowest files,
+    `const_threshold` (--const-threshold PCT) reports missing const in files under PCT% coverage,
+    `duplicates` (--duplicates N) reports subtrees of N+ tokens repeated across files,
+    `store` (--store DB, "" for the default file) records the issues in SQLite, and
+    `baseline` is "save" (--save-baseline) or "compare" (--baseline)."""
+    path = Path(project_path)
+    if not path.exists():
+        print(red(f"ERROR: Path does not exist: {project_path}"))
+        sys.exit(1)
+    output_format = output_format or ("json" if as_json else "text")
+    jobs = jobs or default_jobs()
+    cache = AnalysisCache(path) if use_cache else None
+
+    if watch:
+        watch_project(project_path, path, workspace, include_generated, jobs, cache, output_format,
+                      const_threshold)
+        return
+
+    profile = RunProfile(profile_top) if profile_top is not None else None
+    clock = time.perf_counter()
+    packages, dart_files = discover_project(path, workspace, include_generated)
+    if profile:
+        profile.stage("find_dart_files", time.perf_counter() - clock)
+    hunks = None
+    if changed_since:
+        if hunks_only:
+            hunks = git_changed_lines(path, changed_since)
+            changed = set(hunks)
+        else:
+            changed = git_changed_files(path, changed_since)
+        dart_files = [f for f in dart_files if f in changed]
+        packages = [p for p in packages if p / "pubspec.yaml" in changed]
+
+    results = iter_file_results(dart_files, path, jobs, cache, profile is not None)
+    if profile:
+        results = profile.watch(results)
+    if const_threshold is not None:
+        results = with_const_issues(results, const_threshold)
+    if hunks is not None:
+        results = (in_hunks(r, hunks[path / r.file]) for r in results)
+    project_issues = [i for package in packages for i in check_pubspec(package, path)]
+    if duplicates is not None:
+        clock = time.perf_counter()
+        project_issues += find_duplicate_subtrees(dart_files, path, duplicates, jobs)
+        if profile:
+            profile.stage("duplicate_subtrees", time.perf_counter() - clock)
+    database = None
+    if store is not None or baseline:
+        database = IssueDatabase(Path(store) if store else path / STORE_FILE, path)
+        if baseline == "compare":
+            database.compare_to_baseline()
+        database.start(project_path, baseline == "save")
+    report(project_path, packages, len(dart_files), results, project_issues, output_format,
+           workspace, profile, database)
+    if database:
+        database.close()
+
+
+def report(project_path: str, packages: List[Path], total_files: int, results,
+           project_issues: List[Issue], output_format: str, workspace: bool = False,
+           profile: Optional[RunProfile] = None, database: Optional[IssueDatabase] = None):
+    """Print the audit of `results` (FileResults, in file order) and the
+    project-wide `project_issues` (pubspec, duplicates) in `output_format`.
+    With a `database`, every issue is recorded and only those it returns
+    are reported."""
+    if output_format in STREAM_WRITERS:
+        stream_project(project_path, packages, total_files, results, project_issues,
+                       STREAM_WRITERS[output_format](sys.stdout), profile, database)
+        return
+    keep = database.record if database else (lambda issues: issues)
+
+    store = IssueStore()
+    total_stateful  = 0
+    total_stateless = 0
+    const = ConstTotals()
+    colors = ColorTotals()
+    graph = ImportGraph(Path(project_path))
+    for result in results:
+        store.extend(keep(result.issues))
+        total_stateful  += result.stateful
+        total_stateless += result.stateless
+        const.add(result)
+        colors.add(result)
+        graph.add(result)
+
+    store.extend(keep(check_dark_theme(graph)))
+    store.extend(keep(project_issues))
+
+    # Sort by severity
+    order = store.by_severity()
+
+    if output_format == "json":
+        if profile:
+            print('{\n  "issues": ', end="")
+            write_json_array(store, order, depth=1)
+            print(',\n  "profile": ' + json.dumps(profile.to_dict(), indent=2).replace("\n", "\n  ") + "\n}")
+        else:
+            write_json_array(store, order)
+            print()
+        return
+
+    # ── Report ─────────────────────────────────────────────────────────────
+    print(f"\n{bold('━' * 60)}")
+    print(f"{bold('🎨 Flutter AI UI — Project Audit Report')}")
+    print(f"{bold('━' * 60)}\n")
+    print(f"  📁 Project : {project_path}")
+    if workspace:
+        print(f"  📦 Packages : {len(packages)} pubspec.yaml found")
+    print(f"  🗂️  Files    : {total_files} Dart files analysed")
+    print(f"  🧱 Widgets  : {total_stateful} StatefulWidget, {total_stateless} StatelessWidget")
+    ratio = f"{total_stateful/(total_stateful+total_stateless)*100:.0f}%" if (total_stateful + total_stateless) > 0 else "–"
+    print(f"  📊 Stateful ratio: {ratio} (target < 30%)")
+    coverage = const.coverage
+    if coverage is not None:
+        print(f"  🧊 Const coverage: {coverage:.0%} ({const.const} of {const.const + const.missing} const-able calls)")
+        for worst in const.worst():
+            print(f"       {worst['coverage']:>4.0%}  {worst['const']}/{worst['candidates']}  {worst['file']}")
+    if colors.uses:
+        print(f"  🎨 Colours  : {len(colors.uses)} distinct hardcoded, {sum(colors.uses.values())} literals")
+        for entry in colors.to_list(COLOR_TOP):
+            nearest = ""
+            if "role" in entry:
+                alpha = f" @ alpha {entry['alpha']:.2f}" if "alpha" in entry else ""
+                nearest = (f"  → colorScheme.{entry['role']}{alpha}{' (dark)' if entry['dark'] else ''}, "
+                           f"{entry['palette']} {entry['palette_color']} ΔE {entry['delta_e']:.1f}")
+            print(f"       {entry['color']} ×{entry['uses']}{nearest}")
+    fan_in = graph.to_list(FAN_IN_TOP)
+    if fan_in:
+        print(f"  🕸️  Imports  : {graph.edge_count} between {len(graph.uris)} files; largest transitive fan-in:")
+        for entry in fan_in:
+            print(f"       {entry['dependents']:>5} ({entry['share']:.0%})  {entry['file']}")
+
+    counts = store.counts()
+
+    if database and database.known is not None:
+        print(f"  🧾 Baseline : {database.hidden} known issue(s) hidden, new ones below")
+
+    print(f"\n  🔴 CRITICAL : {counts.get('CRITICAL', 0)}")
+    print(f"  🟠 HIGH     : {counts.get('HIGH', 0)}")
+    print(f"  🟡 MEDIUM   : {counts.get('MEDIUM', 0)}")
+    print(f"  🟢 LOW      : {counts.get('LOW', 0)}")
+    print(f"\n{bold('━' * 60)}\n")
+
+    if not order:
+        print(green("✅ No major issues found! Great work."))
+    else:
+        for row in order:
+            print(repr(store.issue(row)))
+
+    print(f"\n{bold('━' * 60)}")
+    print(f"  Total issues: {len(order)}")
+    if order:
+        print(f"\n  Tip: Address CRITICAL issues first, then HIGH.")
+        print(f"  Run with --json for machine-readable output.")
+    if profile:
+        profile.print_table()
+    print(f"{bold('━' * 60)}\n")
+
+
+def write_json_array(store: IssueStore, rows: List[int], depth: int = 0):
+    """Print store rows as a JSON array, byte-for-byte what json.dumps(...,
+    indent=2) of their to_dict()s would print at nesting `depth`.
+
+    Each distinct string is JSON-encoded once and rows are formatted from
+    the encoded table, so no per-issue dict or Issue is ever built.
+    """
+    out = sys.stdout
+    if not rows:
+        out.write("[]")
+        return
+    pad, inner = "  " * (depth + 1), "  " * (depth + 2)
+    row_format = (pad + "{\n" + ",\n".join(f'{inner}"{key}": %s' for key in (
+        "severity", "category", "file", "line", "message", "suggestion")) + "\n" + pad + "}")
+    encoded: Dict[int, str] = {}
+
+    def enc(i: int) -> str:
+        text = encoded.get(i)
+        if text is None:
+            text = encoded[i] = json.dumps(store.strings[i])
+        return text
+
+    out.write("[\n")
+    chunk: List[str] = []
+    sep = ""
+    for row in rows:
+        line = store.line[row]
+        chunk.append(row_format % (
+            enc(store.severity[row]), enc(store.category[row]), enc(store.file[row]),
+            line if line != IssueStore.NO_LINE else "null",
+            enc(store.message[row]), enc(store.suggestion[row]),
+        ))
+        if len(chunk) == 4096:
+            out.write(sep + ",\n".join(chunk))
+            chunk, sep = [], ",\n"
+    if chunk:
+        out.write(sep + ",\n".join(chunk))
+    out.write("\n" + "  " * depth + "]")
+
+
+def stream_project(project_path: str, packages: List[Path], total_files: int, results,
+                   project_issues: List[Issue], writer, profile: Optional[RunProfile] = None,
+                   database: Optional[IssueDatabase] = None):
+    """Hand each file's issues to `writer` as they arrive, then the totals."""
+    counts = dict.fromkeys(SEVERITIES, 0)
+    total_stateful = total_stateless = 0
+    const = ConstTotals()
+    colors = ColorTotals()
+    graph = ImportGraph(Path(project_path))
+
+    def emit(issues: List[Issue]):
+        if database:
+            issues = database.record(issues)
+        for issue in issues:
+            counts[issue.severity] = counts.get(issue.severity, 0) + 1
+        writer.write(issues)
+
+    for result in results:
+        emit(result.issues)
+        total_stateful  += result.stateful
+        total_stateless += result.stateless
+        const.add(result)
+        colors.add(result)
+        graph.add(result)
+    emit(check_dark_theme(graph))
+    emit(project_issues)
+
+    summary = {
+        "project": project_path,
+        "packages": len(packages),
+        "files": total_files,
+        "stateful": total_stateful,
+        "stateless": total_stateless,
+        "const_coverage": const.to_dict(),
+        "colors": colors.to_dict(),
+        "imports": graph.to_dict(),
+        "issues": sum(counts.values()),
+        "severity": counts,
+    }
+    if database:
+        summary.update(database.summary())
+    if profile:
+        summary["profile"] = profile.to_dict()
+    writer.close(summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Flutter AI UI — Project Audit Tool"
+    )
+    parser.add_argument("--path", required=True, help="Path to Flutter project root")
+    parser.add_argument("--fix-suggestions", action="store_true", help="Show detailed fix suggestions")
+    parser.add_argument("--json", action="store_true", help="Output as JSON (same as --format json)")
+    parser.add_argument("--format", choices=("text", "json", "ndjson", "sarif"), default=None,
+                        help="Report format; ndjson and sarif stream issues as each file is checked")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Worker processes for scanning (default: number of CPUs)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-check every file instead of reusing results from .dart_tool/flutter_ai_ui_cache")
+    parser.add_argument("--workspace", action="store_true",
+                        help="Treat --path as a workspace/monorepo root and audit every package below it")
+    parser.add_argument("--include-generated", action="store_true",
+                        help="Also audit generated *.g.dart, *.freezed.dart and *.mocks.dart files")
+    parser.add_argument("--watch", action="store_true",
+                        help="Stay running and re-audit changed files as they are saved")
+    parser.add_argument("--changed-since", metavar="REF", default=None,
+                        help="Only audit files changed relative to this git ref (e.g. origin/main)")
+    parser.add_argument("--hunks-only", action="store_true",
+                        help="With --changed-since, only report line issues on changed lines")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, default=None, metavar="N",
+                        help="Time each rule, file I/O and discovery, and list the N slowest files (default 10)")
+    parser.add_argument("--duplicates", type=int, nargs="?", const=DUPLICATE_MIN_TOKENS, default=None,
+                        metavar="MIN_TOKENS",
+                        help=f"Report widget subtrees of MIN_TOKENS+ tokens repeated across files (default {DUPLICATE_MIN_TOKENS}); "
+                             "uncached: re-reads every file on each run")
+    parser.add_argument("--const-threshold", type=float, default=None, metavar="PCT",
+                        help="Report each call that could be const in files whose const coverage is below PCT%%")
+    parser.add_argument("--store", nargs="?", const="", default=None, metavar="DB",
+                        help=f"Record the issues in a SQLite file (default <project>/{STORE_FILE.as_posix()})")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Record this run as the --store baseline")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Only report issues not in the --store baseline")
+    parser.add_argument("--from-store", action="store_true",
+                        help="Print the last recorded run from --store instead of scanning")
+    parser.add_argument("--severity", type=str.upper, action="append", choices=SEVERITIES,
+                        help="With --from-store, only this severity (repeatable)")
+    parser.add_argument("--category", action="append",
+                        help="With --from-store, only this category (repeatable)")
     args = parser.parse_args()
 
-    analyse_project(args.path, args.fix_suggestions, args.json)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if args.json and args.format not in (None, "json"):
+        parser.error("--json conflicts with --format " + args.format)
+    if args.hunks_only and not args.changed_since:
+        parser.error("--hunks-only requires --changed-since")
+    if args.watch and args.changed_since:
+        parser.error("--watch cannot be combined with --changed-since")
+    if args.watch and args.profile is not None:
+        parser.error("--watch cannot be combined with --profile")
+    if args.profile is not None and args.profile < 1:
+        parser.error("--profile must list at least 1 file")
+    if args.watch and args.duplicates is not None:
+        parser.error("--watch cannot be combined with --duplicates")
+    if args.duplicates is not None and args.duplicates < 1:
+        parser.error("--duplicates needs a size of at least 1 token")
+    if args.const_threshold is not None and not 0 <= args.const_threshold <= 100:
+        parser.error("--const-threshold must be between 0 and 100")
+    if args.save_baseline and args.baseline:
+        parser.error("--save-baseline conflicts with --baseline")
+    if args.watch and (args.store is not None or args.save_baseline or args.baseline or args.from_store):
+        parser.error("--watch cannot be combined with --store, --baseline or --from-store")
+    if (args.severity or args.category) and not args.from_store:
+        parser.error("--severity and --category filter --from-store queries")
+    if args.from_store and args.save_baseline:
+        parser.error("--from-store only reads the store; audit with --save-baseline instead")
+
+    if args.from_store:
+        if not Path(args.path).exists():
+            print(red(f"ERROR: Path does not exist: {args.path}"))
+            sys.exit(1)
+        query_store(args.path, args.store, args.format or ("json" if args.json else "text"),
+                    args.severity, args.category, args.baseline)
+        sys.exit(0)
+
+    analyse_project(args.path, args.fix_suggestions, args.json, args.jobs, not args.no_cache,
+                    args.format, args.workspace, args.include_generated, args.watch,
+                    args.changed_since, args.hunks_only, args.profile, args.const_threshold,
+                    args.duplicates, args.store,
+                    "save" if args.save_baseline else "compare" if args.baseline else None)
@@ -8,14 +8,35 @@ Usage:
     python create_flutter_project.py --name my_app --template cupertino --output ~/projects
     python create_flutter_project.py --name my_app --template adaptive
     python create_flutter_project.py --list-templates
+    python create_flutter_project.py --manifest projects.json --jobs 8
+    python create_flutter_project.py --manifest projects.yaml --link hardlink
+    python create_flutter_project.py --build-bundles
+
+Manifest (JSON, or YAML when PyYAML is installed) — a list of projects, or
+an object with "defaults" applied to every entry of "projects":
+    {"defaults": {"template": "material3", "output": "apps"},
+     "projects": [{"name": "shop_a"}, {"name": "shop_b", "template": "adaptive"}]}
+Relative "output" directories are resolved against the manifest's folder.
+
+Templates are compiled into bundles under templates/.bundles (one archive
+plus the offsets of every name / title placeholder); they are rebuilt
+automatically whenever a template file changes.
 """
 
 import os
 import re
 import sys
+import json
+import errno
 import shutil
+import struct
+import marshal
 import argparse
+import tempfile
+import threading
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 # ─── ANSI Colors ──────────────────────────────────────────────────────────────
 BOLD  = "\033[1m"
@@ -71,42 +92,305 @@ def validate_project_name(name: str) -> bool:
     return bool(re.match(r'^[a-z][a-z0-9_]*$', name))
 
 
-def copy_template(template_key: str, project_name: str, output_dir: Path):
+class ScaffoldError(Exception):
+    """A project could not be created; the message says why."""
+
+
+# ─── File Placement ───────────────────────────────────────────────────────────
+LINK_MODES = ["auto", "reflink", "hardlink", "copy"]
+# os.link errors that mean "not here" rather than "something is wrong".
+_NO_LINK_ERRNOS = {errno.EXDEV, errno.EMLINK, errno.EPERM, errno.EOPNOTSUPP}
+FICLONE = 0x40049409   # Linux ioctl: share the source's extents copy-on-write
+
+
+def _reflink(src: Path, dst: Path):
+    """Clone `src` to `dst` copy-on-write (btrfs, XFS, APFS); OSError if unsupported."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, "rb") as fin, open(dst, "xb") as fout:
+            try:
+                fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            except OSError:
+                fout.close()
+                os.unlink(dst)
+                raise
+    elif sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(dst))
+    else:
+        raise OSError(errno.EOPNOTSUPP, "reflinks not supported on this platform", str(dst))
+    shutil.copystat(src, dst)
+
+
+class FilePlacer:
+    """Puts unchanged template files in place: reflink, hard link or copy.
+
+    "auto" reflinks where the filesystem can and copies otherwise; either
+    way the project's files are independent of the template. "hardlink"
+    shares the template's inodes, which saves the most space but means an
+    in-place edit changes the template too, so it is only used on request;
+    off the template's filesystem it copies.
+    """
+
+    def __init__(self, mode: str = "auto"):
+        self.mode = mode
+        self.reflink_ok = mode in ("auto", "reflink")
+
+    def place(self, src: Path, dst: Path, data=None, mode: int = 0o644) -> str:
+        """Create `dst` from `src`; returns how ("reflink", "hardlink" or "copy").
+
+        Copies write `data` (the file's bytes, from a bundle) when given
+        rather than reading `src` again.
+        """
+        if self.mode == "hardlink":
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError as e:
+                # Another filesystem (or one without hard links): copy instead.
+                if e.errno not in _NO_LINK_ERRNOS:
+                    raise ScaffoldError(f"cannot hard-link {src} → {dst}: {e.strerror}")
+        if self.reflink_ok:
+            try:
+                _reflink(src, dst)
+                return "reflink"
+            except OSError as e:
+                if self.mode == "reflink":
+                    raise ScaffoldError(f"cannot reflink {src} → {dst}: {e.strerror}")
+                # Manifest workers share this placer and may race on the flag;
+                # that is tolerated on purpose — a stale True only costs one
+                # more failed reflink attempt before the copy.
+                self.reflink_ok = False   # same filesystem for the rest of the run
+        if data is None:
+            shutil.copy2(src, dst)
+        else:
+            _write(dst, data, mode)
+        return "copy"
+
+
+def _write(dst: Path, data, mode: int):
+    with open(dst, "xb") as f:
+        f.write(data)
+    os.chmod(dst, mode)
+
+
+# ─── Template Bundles ─────────────────────────────────────────────────────────
+# Template text replaced in every file of a new project, and by what.
+PLACEHOLDERS = {
+    "flutter_material3_starter": "name",
+    "flutter_cupertino_starter": "name",
+    "flutter_adaptive_starter":  "name",
+    "Flutter M3 App":            "title",
+    "Flutter Cupertino Starter": "title",
+    "Flutter Adaptive Starter":  "title",
+}
+PLACEHOLDER_KINDS = ["name", "title"]
+
+BUNDLES_DIR   = TEMPLATES_DIR / ".bundles"
+BUNDLE_FORMAT = 1
+BUNDLE_MAGIC  = b"FLUTTER-AI-UI-TEMPLATE"
+
+
+def _bundle_header() -> bytes:
+    return BUNDLE_MAGIC + f" {BUNDLE_FORMAT} {sys.implementation.cache_tag}\n".encode()
+
+
+def _walk_template(template_src: Path) -> Tuple[List[str], List[Tuple[str, os.stat_result]]]:
+    """(directories, (file, stat) pairs) of a template, in a stable order."""
+    dirs, files = [], []
+    for here, dirnames, filenames in os.walk(template_src):
+        dirnames[:] = sorted(d for d in dirnames if d != BUNDLES_DIR.name)
+        rel_dir = Path(here).relative_to(template_src)
+        dirs.extend((rel_dir / d).as_posix() for d in dirnames)
+        for name in sorted(filenames):
+            rel = (rel_dir / name).as_posix()
+            files.append((rel, os.stat(template_src / rel)))
+    return dirs, files
+
+
+def _fingerprint(dirs: List[str], files: List[Tuple[str, os.stat_result]]) -> tuple:
+    return (tuple(dirs), tuple((rel, st.st_size, st.st_mtime_ns) for rel, st in files),
+            tuple(PLACEHOLDERS.items()))
+
+
+class TemplateBundle:
+    """One template compiled into an archive plus an index of its placeholders.
+
+    `files` holds (path, mode, offset, length, splices) per file, where the
+    file's bytes are blob[offset:offset + length] and splices are
+    (position, length, kind) placeholder hits inside them, kind indexing
+    PLACEHOLDER_KINDS. Instantiating only slices and joins at those offsets.
+    """
+
+    def __init__(self, key: str, index: dict, blob):
+        self.key    = key
+        self.source = TEMPLATES_DIR / key
+        self.index  = index
+        self.dirs   = index["dirs"]
+        self.files  = index["files"]
+        self.blob   = blob
+
+    @classmethod
+    def compile(cls, key: str) -> "TemplateBundle":
+        """Read every file of a template once and index its placeholders."""
+        source = TEMPLATES_DIR / key
+        dirs, stats = _walk_template(source)
+        pattern = re.compile(b"|".join(re.escape(p.encode()) for p in
+                                       sorted(PLACEHOLDERS, key=len, reverse=True)))
+        kinds = {p.encode(): PLACEHOLDER_KINDS.index(kind) for p, kind in PLACEHOLDERS.items()}
+
+        chunks, files, offset = [], [], 0
+        for rel, st in stats:
+            data = (source / rel).read_bytes()
+            try:
+                data.decode("utf-8")   # placeholders are only spliced into text
+                splices = tuple((m.start(), m.end() - m.start(), kinds[m.group()])
+                                for m in pattern.finditer(data))
+            except UnicodeDecodeError:
+                splices = ()
+            files.append((rel, st.st_mode & 0o7777, offset, len(data), splices))
+            chunks.append(data)
+            offset += len(data)
+        index = {"sources": _fingerprint(dirs, stats), "dirs": dirs, "files": files}
+        return cls(key, index, b"".join(chunks))
+
+    def save(self, path: Path):
+        index = marshal.dumps(self.index)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A private temp file per writer, so concurrent saves never share one.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_bundle_header())
+                f.write(struct.pack("<Q", len(index)))
+                f.write(index)
+                f.write(self.blob)
+            os.chmod(tmp, 0o644)  # mkstemp creates it owner-only
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def read(cls, key: str, path: Path) -> Optional["TemplateBundle"]:
+        """The bundle saved at `path`, or None if missing or in another format."""
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        header = _bundle_header()
+        start = len(header) + 8
+        if not data.startswith(header) or len(data) < start:
+            return None
+        (size,) = struct.unpack_from("<Q", data, len(header))
+        try:
+            index = marshal.loads(data[start:start + size])
+        except (EOFError, ValueError, TypeError):
+            return None
+        return cls(key, index, memoryview(data)[start + size:])
+
+    def render(self, splices: tuple, data, values: List[bytes]) -> bytes:
+        parts, last = [], 0
+        for pos, length, kind in splices:
+            parts.append(data[last:pos])
+            parts.append(values[kind])
+            last = pos + length
+        parts.append(data[last:])
+        return b"".join(parts)
+
+    def instantiate(self, dest: Path, project_name: str, placer: FilePlacer) -> Dict[str, int]:
+        """Write the project's files under the (existing, empty) `dest`."""
+        values = [project_name.encode(), project_name.replace("_", " ").title().encode()]
+        counts = {"written": 0, "reflink": 0, "hardlink": 0, "copy": 0}
+        for rel in self.dirs:
+            (dest / rel).mkdir()
+        for rel, mode, offset, length, splices in self.files:
+            data = self.blob[offset:offset + length]
+            if splices:
+                _write(dest / rel, self.render(splices, data, values), mode)
+                counts["written"] += 1
+            else:
+                counts[placer.place(self.source / rel, dest / rel, data, mode)] += 1
+        return counts
+
+
+_BUNDLES: Dict[str, TemplateBundle] = {}
+_BUNDLES_LOCK = threading.Lock()
+
+
+def load_bundle(template_key: str) -> TemplateBundle:
+    """A template's bundle, recompiled (and re-saved) if the template changed.
+
+    The check is a stat of each template file; a bundle that cannot be saved
+    (read-only install) is used from memory. Safe to call from --manifest
+    workers: the first caller builds the bundle, the others wait for it.
+    """
+    with _BUNDLES_LOCK:
+        if template_key not in _BUNDLES:
+            _BUNDLES[template_key] = _build_bundle(template_key)
+        return _BUNDLES[template_key]
+
+
+def _build_bundle(template_key: str) -> TemplateBundle:
     template_src = TEMPLATES_DIR / template_key
-    if not template_src.exists():
-        print(red(f"ERROR: Template '{template_key}' not found at {template_src}"))
-        sys.exit(1)
+    if not template_src.is_dir():
+        raise ScaffoldError(f"Template '{template_key}' not found at {template_src}")
 
+    path = BUNDLES_DIR / f"{template_key}.bundle"
+    bundle = TemplateBundle.read(template_key, path)
+    if bundle is None or bundle.index["sources"] != _fingerprint(*_walk_template(template_src)):
+        bundle = TemplateBundle.compile(template_key)
+        try:
+            bundle.save(path)
+        except OSError:
+            pass
+    return bundle
+
+
+# ─── Scaffolding ──────────────────────────────────────────────────────────────
+def create_project(template_key: str, project_name: str, output_dir: Path,
+                   placer: Optional[FilePlacer] = None) -> Dict[str, int]:
+    """Create `output_dir/project_name` from a template.
+
+    Returns how many files were written, reflinked, hard-linked or copied.
+    Raises ScaffoldError (removing anything half-created) on failure.
+    """
+    bundle = load_bundle(template_key)
     dest = output_dir / project_name
-    if dest.exists():
-        print(red(f"ERROR: Directory '{dest}' already exists."))
-        sys.exit(1)
+    try:
+        dest.mkdir(parents=True)
+    except FileExistsError:
+        raise ScaffoldError(f"Directory '{dest}' already exists.")
+    except OSError as e:
+        raise ScaffoldError(f"Cannot create '{dest}': {e.strerror}")
 
+    try:
+        return bundle.instantiate(dest, project_name, placer or FilePlacer())
+    except (OSError, ScaffoldError) as e:
+        shutil.rmtree(dest, ignore_errors=True)
+        if isinstance(e, ScaffoldError):
+            raise
+        raise ScaffoldError(f"Cannot create '{dest}': {e.strerror or e}")
+
+
+def copy_template(template_key: str, project_name: str, output_dir: Path, link: str = "auto"):
+    dest = output_dir / project_name
     print(f"\n{bold('🚀 Creating Flutter project...')}")
     print(f"  Template : {cyan(template_key)} ({TEMPLATES[template_key]['name']})")
     print(f"  Name     : {cyan(project_name)}")
     print(f"  Location : {cyan(str(dest))}\n")
 
-    # Copy template
-    shutil.copytree(template_src, dest)
-
-    # Update project name in pubspec.yaml
-    pubspec = dest / "pubspec.yaml"
-    if pubspec.exists():
-        content = pubspec.read_text()
-        # Replace template name with project name
-        for old_name in ["flutter_material3_starter", "flutter_cupertino_starter", "flutter_adaptive_starter"]:
-            content = content.replace(old_name, project_name)
-        pubspec.write_text(content)
-
-    # Update app title in main.dart
-    main_dart = dest / "lib" / "main.dart"
-    if main_dart.exists():
-        content = main_dart.read_text()
-        # Replace title strings
-        for old_title in ["Flutter M3 App", "Flutter Cupertino Starter", "Flutter Adaptive Starter"]:
-            content = content.replace(old_title, project_name.replace("_", " ").title())
-        main_dart.write_text(content)
+    try:
+        create_project(template_key, project_name, output_dir, FilePlacer(link))
+    except ScaffoldError as e:
+        print(red(f"ERROR: {e}"))
+        sys.exit(1)
 
     print(green("✅ Project created successfully!\n"))
     print(f"{bold('Next steps:')}")
@@ -128,6 +412,102 @@ def copy_template(template_key: str, project_name: str, output_dir: Path):
     print(f"  {bold('🔍 Audit your project:')} python ../flutter-ai-ui-skill/scripts/analyse_flutter_project.py --path .\n")
 
 
+# ─── Manifest ─────────────────────────────────────────────────────────────────
+def load_manifest(path: Path, default_output: Path) -> List[dict]:
+    """Validated project entries (name, template, output) from a manifest.
+
+    Raises ScaffoldError listing every problem, so nothing is created from
+    a manifest with a mistake in it.
+    """
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise ScaffoldError(f"Cannot read manifest {path}: {e.strerror}")
+
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ScaffoldError("YAML manifests need PyYAML (pip install pyyaml); or use a .json manifest.")
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ScaffoldError(f"Invalid YAML in {path}: {e}")
+    else:
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ScaffoldError(f"Invalid JSON in {path}: {e}")
+
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults") or {}
+        data = data.get("projects")
+    if not isinstance(data, list) or not isinstance(defaults, dict):
+        raise ScaffoldError(f"{path}: expected a list of projects or {{\"projects\": [...]}}")
+
+    entries, problems, seen = [], [], {}
+    for i, raw in enumerate(data, 1):
+        if not isinstance(raw, dict):
+            problems.append(f"project #{i}: expected an object")
+            continue
+        entry = dict(defaults, **raw)
+        name, template = entry.get("name"), entry.get("template")
+        label = f"project #{i} ({name})" if name else f"project #{i}"
+        if not isinstance(name, str) or not validate_project_name(name):
+            problems.append(f"{label}: invalid or missing name (lowercase with underscores)")
+            continue
+        if template not in TEMPLATES:
+            problems.append(f"{label}: unknown template {template!r} (use {', '.join(TEMPLATES)})")
+            continue
+        output = entry.get("output")
+        output = (path.parent / Path(output).expanduser()) if output else default_output
+        output = output.resolve()
+        dest = output / name
+        if dest in seen:
+            problems.append(f"{label}: same directory as project #{seen[dest]} ({dest})")
+            continue
+        seen[dest] = i
+        entries.append({"name": name, "template": template, "output": output})
+
+    if problems:
+        raise ScaffoldError(f"{path}:\n  " + "\n  ".join(problems))
+    return entries
+
+
+def create_from_manifest(entries: List[dict], jobs: int, link: str) -> int:
+    """Create every project on a thread pool; returns how many failed."""
+    placer = FilePlacer(link)
+
+    def run(entry):
+        try:
+            entry["output"].mkdir(parents=True, exist_ok=True)
+            return entry, create_project(entry["template"], entry["name"], entry["output"], placer), None
+        except ScaffoldError as e:
+            return entry, None, str(e)
+        except OSError as e:
+            return entry, None, f"Cannot create '{entry['output']}': {e.strerror}"
+
+    print(f"\n{bold('🚀 Creating')} {len(entries)} {bold('Flutter projects')} "
+          f"(--jobs {jobs}, --link {link})\n")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for entry, counts, error in pool.map(run, entries):
+            dest = entry["output"] / entry["name"]
+            if error:
+                failed += 1
+                print(f"  {red('❌')} {bold(entry['name'])}: {red(error)}")
+                continue
+            placed = ", ".join(f"{n} {how}" for how, n in counts.items() if n and how != "written")
+            print(f"  {green('✅')} {bold(entry['name'])} → {dest}  "
+                  f"[{entry['template']}; {counts['written']} written{', ' + placed if placed else ''}]")
+
+    ok = len(entries) - failed
+    summary = f"{ok} created, {failed} failed"
+    print(f"\n  {green(summary) if not failed else red(summary)}\n")
+    return failed
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Flutter AI UI — Project Scaffolder"
@@ -137,12 +517,51 @@ def main():
                         choices=list(TEMPLATES.keys()))
     parser.add_argument("--output",   "-o", help="Output directory (default: current directory)", default=".")
     parser.add_argument("--list-templates", "-l", action="store_true", help="List all available templates")
+    parser.add_argument("--manifest", "-m", metavar="FILE",
+                        help="Create every project listed in a JSON (or YAML) manifest")
+    parser.add_argument("--jobs", "-j", type=int, default=min(8, os.cpu_count() or 1),
+                        help="With --manifest, projects created in parallel (default: CPUs, at most 8)")
+    parser.add_argument("--link", choices=LINK_MODES, default="auto",
+                        help="How unchanged template files are placed: auto (reflink if the filesystem "
+                             "supports it, else copy), reflink, hardlink (shares files with the "
+                             "template; copies when the output is on another filesystem), "
+                             "copy (default: auto)")
+    parser.add_argument("--build-bundles", action="store_true",
+                        help="(Re)compile every template into its bundle under templates/.bundles")
     args = parser.parse_args()
 
     if args.list_templates:
         list_templates()
         return
 
+    if args.build_bundles:
+        for key in TEMPLATES:
+            try:
+                bundle = TemplateBundle.compile(key)
+                bundle.save(BUNDLES_DIR / f"{key}.bundle")
+            except (OSError, ScaffoldError) as e:
+                print(red(f"ERROR: cannot build the '{key}' bundle: {getattr(e, 'strerror', None) or e}"))
+                sys.exit(1)
+            spliced = sum(1 for f in bundle.files if f[4])
+            hits = sum(len(f[4]) for f in bundle.files)
+            print(f"  {green('✅')} {bold(key)}: {len(bundle.files)} files, "
+                  f"{hits} placeholders in {spliced} files → {BUNDLES_DIR / (key + '.bundle')}")
+        return
+
+    if args.manifest:
+        output = Path(args.output).expanduser().resolve()
+        try:
+            entries = load_manifest(Path(args.manifest).expanduser(), output)
+        except ScaffoldError as e:
+            print(red(f"ERROR: {e}"))
+            sys.exit(1)
+        if not entries:
+            print(yellow("The manifest lists no projects."))
+            return
+        if create_from_manifest(entries, args.jobs, args.link):
+            sys.exit(1)
+        return
+
     if not args.name:
         print(red("ERROR: --name is required. Example: --name my_flutter_app"))
         parser.print_help()
@@ -161,7 +580,7 @@ def main():
 
     output = Path(args.output).expanduser().resolve()
     output.mkdir(parents=True, exist_ok=True)
-    copy_template(args.template, args.name, output)
+    copy_template(args.template, args.name, output, args.link)
 
 
 if __name__ == "__main__":
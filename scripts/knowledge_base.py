@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Flutter AI UI — Knowledge Base Snapshot
+Compiles the data/ CSVs into one binary snapshot that loads with a single
+read, and loads tables from it (falling back to the CSVs when needed).
+The snapshot also carries a ranked (BM25) search index over every table.
+
+The snapshot is rebuilt automatically whenever a CSV's content changes, so
+building it by hand is optional.
+
+Usage:
+    python knowledge_base.py --build
+    python knowledge_base.py --status
+    python knowledge_base.py --query "list performance" --limit 5
+"""
+
+import os
+import re
+import sys
+import csv
+import math
+import heapq
+import marshal
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# ─── ANSI Colors ──────────────────────────────────────────────────────────────
+BOLD   = "\033[1m"
+RED    = "\033[91m"
+GREEN  = "\033[92m"
+YELLOW = "\033[93m"
+RESET  = "\033[0m"
+
+SCRIPT_DIR    = Path(__file__).parent
+DATA_DIR      = SCRIPT_DIR.parent / "data"
+SNAPSHOT_PATH = DATA_DIR / "knowledge_base.snapshot"
+
+# Table name -> CSV path under data/
+SOURCES: Dict[str, Path] = {
+    "guidelines": Path("stacks") / "flutter_guidelines.csv",
+    "colors":     Path("flutter_colors.csv"),
+    "typography": Path("flutter_typography.csv"),
+    "animations": Path("flutter_animations.csv"),
+    "components": Path("flutter_components.csv"),
+}
+
+# Indexed columns per table and their weight in the ranking. A title hit
+# outweighs a hit in a code sample; columns not listed are not searched.
+FIELD_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "guidelines": {"Guideline": 3.0, "Category": 2.0, "Do": 1.0, "Don't": 1.0,
+                   "Flutter Example": 0.5},
+    "colors":     {"App Type": 3.0, "Notes": 1.0},
+    "typography": {"Pairing Name": 3.0, "Category": 1.5, "Display Font": 2.0, "Body Font": 2.0,
+                   "Mood Keywords": 1.5, "Best For": 1.5, "Notes": 1.0},
+    "animations": {"Animation Name": 3.0, "Category": 2.0, "Use Case": 1.5,
+                   "Flutter Widget / API": 1.5, "Curve": 1.0, "Notes": 1.0, "Dart Code Snippet": 0.5},
+    "components": {"Component": 3.0, "Category": 2.0, "Description": 1.5, "Key Widgets": 1.5,
+                   "Do": 1.0, "Don't": 1.0, "Flutter Code Pattern": 0.5},
+}
+
+# Column naming each row in ranked results.
+TITLE_FIELDS = {"guidelines": "Guideline", "colors": "App Type", "typography": "Pairing Name",
+                "animations": "Animation Name", "components": "Component"}
+
+BM25_K1 = 1.2
+BM25_B  = 0.75
+
+# Bump when the payload layout changes. marshal's format may change between
+# Python versions, so the interpreter's cache tag is part of the header too.
+SNAPSHOT_FORMAT = 2
+MAGIC = b"FLUTTER-AI-UI-KB"
+
+
+def _header() -> bytes:
+    return MAGIC + f" {SNAPSHOT_FORMAT} {sys.implementation.cache_tag}\n".encode()
+
+
+# ─── Tables ───────────────────────────────────────────────────────────────────
+class Table(list):
+    """The rows of one CSV as dicts, plus what searches need precomputed.
+
+    `lower` holds the same rows with every field lowercased, and
+    `by_category` maps each lowercase Category value to its row numbers.
+    """
+
+    def __init__(self, columns: List[str], rows: List[tuple], lower: List[tuple],
+                 by_category: Dict[str, List[int]]):
+        super().__init__(dict(zip(columns, row)) for row in rows)
+        self.columns     = columns
+        self.lower       = [dict(zip(columns, row)) for row in lower]
+        self.by_category = by_category
+
+
+def _compile_csv(path: Path) -> dict:
+    """Parse one CSV into the snapshot's table layout."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        rows = [tuple(row + [''] * (len(columns) - len(row)))[:len(columns)] for row in reader if row]
+    lower = [tuple(field.lower() for field in row) for row in rows]
+    by_category: Dict[str, List[int]] = {}
+    if "Category" in columns:
+        col = columns.index("Category")
+        for i, row in enumerate(lower):
+            by_category.setdefault(row[col], []).append(i)
+    return {"columns": columns, "rows": rows, "lower": lower, "by_category": by_category}
+
+
+def _table(data: dict) -> Table:
+    return Table(data["columns"], data["rows"], data["lower"], data["by_category"])
+
+
+# ─── Search Index ─────────────────────────────────────────────────────────────
+WORD_RE  = re.compile(r"[A-Za-z0-9]+")
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def _term(word: str) -> str:
+    word = word.lower()
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]   # "lists" finds "list"
+    return word
+
+
+@lru_cache(maxsize=None)
+def _word_terms(word: str) -> Tuple[str, ...]:
+    parts = CAMEL_RE.findall(word)
+    if len(parts) > 1:
+        return (_term(word),) + tuple(_term(part) for part in parts)
+    return (_term(word),)
+
+
+def tokenize(text: str, split_camel: bool = True) -> List[str]:
+    """Search terms in `text`: lowercased words with plural "s" dropped.
+
+    Indexed text also yields the parts of camelCase words, so "list" finds
+    ListView; queries keep whole words so "ListView" stays specific.
+    """
+    if not split_camel:
+        return [_term(word) for word in WORD_RE.findall(text)]
+    terms = []
+    for word in WORD_RE.findall(text):
+        terms.extend(_word_terms(word))
+    return terms
+
+
+def _build_index(tables: Dict[str, dict]) -> dict:
+    """BM25 impacts per term, with field weights scaling term frequencies.
+
+    Each posting stores its document's complete score contribution for that
+    term, so a query only sums postings.
+    """
+    docs: List[Tuple[str, int]] = []
+    freqs: List[Dict[str, float]] = []
+    lengths: List[float] = []
+    for name, data in tables.items():
+        weights = FIELD_WEIGHTS.get(name, {})
+        fields = [(data["columns"].index(col), w) for col, w in weights.items() if col in data["columns"]]
+        for r, row in enumerate(data["rows"]):
+            tf: Dict[str, float] = {}
+            length = 0.0
+            for col, weight in fields:
+                for term in tokenize(row[col]):
+                    tf[term] = tf.get(term, 0.0) + weight
+                    length += weight
+            docs.append((name, r))
+            freqs.append(tf)
+            lengths.append(length)
+
+    df: Dict[str, int] = {}
+    for tf in freqs:
+        for term in tf:
+            df[term] = df.get(term, 0) + 1
+    n = len(docs)
+    avg_length = (sum(lengths) / n) if n else 1.0
+    idf = {term: math.log(1 + (n - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+
+    postings: Dict[str, Tuple[list, list]] = {term: ([], []) for term in df}
+    for d, (tf, length) in enumerate(zip(freqs, lengths)):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1.0))
+        for term, f in tf.items():
+            ids, impacts = postings[term]
+            ids.append(d)
+            impacts.append(idf[term] * f * (BM25_K1 + 1) / (f + norm))
+    return {"docs": docs,
+            "postings": {term: (tuple(ids), tuple(impacts)) for term, (ids, impacts) in postings.items()}}
+
+
+class SearchIndex:
+    """Ranked search over every table, from the snapshot's prebuilt postings."""
+
+    def __init__(self, tables: Dict[str, "Table"], index: dict):
+        self.tables   = tables
+        self.docs     = index["docs"]
+        self.postings = index["postings"]
+
+    def search(self, query: str, limit: int = 10, tables=None, where=None) -> List[dict]:
+        """The `limit` best rows for `query`, best first.
+
+        Every query word adds its score, so rows matching more of the words
+        rank higher. `tables` restricts the tables searched; `where(table,
+        row)` filters candidates before the top-k selection.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query, split_camel=False)):
+            ids, impacts = self.postings.get(term, ((), ()))
+            for d, impact in zip(ids, impacts):
+                scores[d] = scores.get(d, 0.0) + impact
+
+        candidates = scores.items()
+        if tables is not None or where is not None:
+            candidates = [
+                (d, score) for d, score in candidates
+                if (tables is None or self.docs[d][0] in tables)
+                and (where is None or where(self.docs[d][0], self.tables[self.docs[d][0]][self.docs[d][1]]))
+            ]
+        top = heapq.nlargest(max(limit, 0), candidates, key=lambda hit: (hit[1], -hit[0]))
+        results = []
+        for d, score in top:
+            name, r = self.docs[d]
+            results.append({"table": name, "score": round(score, 4), "row": self.tables[name][r]})
+        return results
+
+
+# ─── Snapshot ─────────────────────────────────────────────────────────────────
+def _stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def build_snapshot(data_dir: Path = DATA_DIR, snapshot: Path = SNAPSHOT_PATH) -> dict:
+    """Compile every CSV under `data_dir` and write the snapshot atomically.
+
+    Returns the payload; a missing CSV is recorded as absent. Failing to
+    write (read-only install) is not an error: the payload is still usable.
+    """
+    payload = {"sources": {}, "tables": {}}
+    for name, rel in SOURCES.items():
+        path = data_dir / rel
+        stat = _stat(path)
+        if stat is None:
+            payload["sources"][name] = None
+            continue
+        payload["sources"][name] = [stat[0], stat[1], _sha256(path)]
+        payload["tables"][name] = _compile_csv(path)
+    payload["index"] = _build_index(payload["tables"])
+
+    # A private temp file per writer: several processes may rebuild at once.
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=snapshot.parent, prefix=snapshot.name + ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_header() + marshal.dumps(payload))
+        os.chmod(tmp, 0o644)  # mkstemp creates it owner-only
+        os.replace(tmp, snapshot)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+    return payload
+
+
+def _is_current(payload: dict, data_dir: Path) -> Tuple[bool, bool]:
+    """(usable, stats_moved): content matches the CSVs; some mtime changed."""
+    moved = False
+    for name, rel in SOURCES.items():
+        recorded = payload["sources"].get(name)
+        stat = _stat(data_dir / rel)
+        if recorded is None or stat is None:
+            if recorded != stat:
+                return False, moved
+            continue
+        if (recorded[0], recorded[1]) == stat:
+            continue
+        # Touched (checkout, copy): only the content hash decides.
+        if recorded[0] != stat[0] or recorded[2] != _sha256(data_dir / rel):
+            return False, moved
+        moved = True
+    return True, moved
+
+
+def read_snapshot(snapshot: Path = SNAPSHOT_PATH) -> Optional[dict]:
+    """The snapshot's payload, or None if it is missing or from another format."""
+    try:
+        data = snapshot.read_bytes()
+    except OSError:
+        return None
+    header = _header()
+    if not data.startswith(header):
+        return None
+    try:
+        return marshal.loads(memoryview(data)[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+_LOADED: Optional[Tuple[Dict[str, Table], SearchIndex]] = None
+
+
+def _load(data_dir: Path, snapshot: Path) -> Tuple[Dict[str, Table], SearchIndex]:
+    payload = read_snapshot(snapshot)
+    if payload is not None:
+        usable, moved = _is_current(payload, data_dir)
+        if not usable:
+            payload = None
+        elif moved:
+            build_snapshot(data_dir, snapshot)   # refresh the recorded mtimes
+    if payload is None:
+        payload = build_snapshot(data_dir, snapshot)
+
+    tables = {name: _table(data) for name, data in payload["tables"].items()}
+    return tables, SearchIndex(tables, payload["index"])
+
+
+def load_tables(data_dir: Path = DATA_DIR, snapshot: Path = SNAPSHOT_PATH) -> Dict[str, Table]:
+    """Every table, from the snapshot when it is current, else from the CSVs.
+
+    A stale or missing snapshot is rebuilt on the way (if data/ is
+    writable), so only the first call after a CSV edit parses CSV.
+    """
+    global _LOADED
+    if data_dir != DATA_DIR or snapshot != SNAPSHOT_PATH:
+        return _load(data_dir, snapshot)[0]
+    if _LOADED is None:
+        _LOADED = _load(data_dir, snapshot)
+    return _LOADED[0]
+
+
+def load_index() -> SearchIndex:
+    """The ranked search index over every table (loaded with the tables)."""
+    load_tables()
+    return _LOADED[1]
+
+
+def reset():
+    """Forget the tables loaded by this process (the next load re-checks the CSVs)."""
+    global _LOADED
+    _LOADED = None
+
+
+def load_table(name: str) -> Table:
+    """One table by name (see SOURCES); empty if its CSV does not exist."""
+    table = load_tables().get(name)
+    return table if table is not None else Table([], [], [], {})
+
+
+def status() -> str:
+    payload = read_snapshot()
+    if payload is None:
+        return "missing"
+    return "current" if _is_current(payload, DATA_DIR)[0] else "stale"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flutter AI UI — Knowledge Base Snapshot")
+    parser.add_argument("--build", action="store_true", help="(Re)compile data/*.csv into the snapshot")
+    parser.add_argument("--status", action="store_true", help="Show whether the snapshot is current")
+    parser.add_argument("--query", "-q", help="Ranked search across every table")
+    parser.add_argument("--limit", "-n", type=int, default=10, help="With --query, how many results (default 10)")
+    args = parser.parse_args()
+
+    if args.query:
+        hits = load_index().search(args.query, args.limit)
+        if not hits:
+            print(f"{YELLOW}No rows matched your query.{RESET}")
+        for hit in hits:
+            title = hit["row"].get(TITLE_FIELDS.get(hit["table"], ""), "")
+            print(f"{hit['score']:>7.2f}  {BOLD}{hit['table']:<11}{RESET} {title}")
+    elif args.build:
+        payload = build_snapshot()
+        if not SNAPSHOT_PATH.exists():
+            print(f"{RED}ERROR:{RESET} Could not write {SNAPSHOT_PATH}")
+            sys.exit(1)
+        rows = sum(len(t["rows"]) for t in payload["tables"].values())
+        print(f"{GREEN}✅ Snapshot built:{RESET} {SNAPSHOT_PATH} "
+              f"({len(payload['tables'])} tables, {rows} rows)")
+    else:
+        state = status()
+        color = GREEN if state == "current" else YELLOW
+        print(f"{BOLD}Snapshot{RESET} {SNAPSHOT_PATH}: {color}{state}{RESET}")
+        for name, rel in SOURCES.items():
+            print(f"  • {name:<11} data/{rel.as_posix()}")
@@ -1,19 +1,36 @@
 #!/usr/bin/env python3
 """
 Flutter Guidelines Search Tool
-Search the flutter_guidelines.csv for relevant best-practice rules.
+Search the flutter_guidelines.csv for relevant best-practice rules, or rank
+rows from every knowledge-base CSV against a free-text query.
 
 Usage:
     python search_guidelines.py --keyword "animation"
     python search_guidelines.py --category "accessibility"
     python search_guidelines.py --severity "critical"
     python search_guidelines.py --keyword "list" --severity "high"
+    python search_guidelines.py --query "list performance" --limit 5
+    python search_guidelines.py --serve                  # JSON lines on stdin/stdout
+    python search_guidelines.py --batch queries.jsonl    # same protocol, from a file
+
+Server / batch protocol — one JSON object per line in, one per line out:
+    {"id": 1, "op": "search", "keyword": "list", "severity": "high"}
+    {"id": 1, "ok": true, "count": 3, "results": [{"No": "...", ...}, ...]}
+    {"id": 2, "op": "categories"}
+    {"id": 2, "ok": true, "categories": [{"name": "Accessibility", "count": 5}, ...]}
+    {"id": 3, "op": "query", "query": "list performance", "limit": 5}
+    {"id": 3, "ok": true, "count": 5, "results": [{"table": "guidelines", "score": 8.06, "row": {...}}, ...]}
+Failures answer {"id": ..., "ok": false, "error": "..."}; "op": "reload"
+re-reads the guidelines.
 """
 
-import csv
+import sys
+import json
 import argparse
 from pathlib import Path
 
+import knowledge_base
+
 # Colors
 BOLD   = "\033[1m"
 RED    = "\033[91m"
@@ -33,37 +50,99 @@ SCRIPT_DIR = Path(__file__).parent
 CSV_PATH   = SCRIPT_DIR.parent / "data" / "stacks" / "flutter_guidelines.csv"
 
 
-def load_guidelines() -> list:
+def load_guidelines() -> knowledge_base.Table:
+    """The guidelines table, from the knowledge base snapshot when current."""
     if not CSV_PATH.exists():
-        print(f"{RED}ERROR:{RESET} Guidelines file not found at {CSV_PATH}")
-        return []
-    with open(CSV_PATH, newline='', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
+        print(f"{RED}ERROR:{RESET} Guidelines file not found at {CSV_PATH}", file=sys.stderr)
+        return knowledge_base.Table([], [], [], {})
+    return knowledge_base.load_table("guidelines")
 
 
 def search(guidelines: list, keyword: str = None, category: str = None,
            severity: str = None) -> list:
+    # A knowledge_base.Table carries prebuilt lowercase rows and a category
+    # index; a plain list of dicts is lowercased here.
+    lower = getattr(guidelines, "lower", None)
+    if lower is None:
+        lower = [{k: (v or '').lower() for k, v in row.items()} for row in guidelines]
+
+    candidates = range(len(guidelines))
+    if category:
+        index = getattr(guidelines, "by_category", None)
+        if index is not None:
+            cat = category.lower()
+            candidates = sorted(i for name, rows in index.items() if cat in name for i in rows)
+
+    kw  = keyword.lower() if keyword else None
+    sev = severity.lower() if severity else None
     results = []
-    for row in guidelines:
-        match = True
-        if keyword:
-            kw = keyword.lower()
-            match = match and (
-                kw in row.get('Guideline', '').lower() or
-                kw in row.get('Do', '').lower() or
-                kw in row.get("Don't", '').lower() or
-                kw in row.get('Category', '').lower() or
-                kw in row.get('Flutter Example', '').lower()
-            )
-        if category:
-            match = match and category.lower() in row.get('Category', '').lower()
-        if severity:
-            match = match and severity.lower() in row.get('Severity', '').lower()
-        if match:
-            results.append(row)
+    for i in candidates:
+        low = lower[i]
+        if kw and not (
+            kw in low.get('Guideline', '') or
+            kw in low.get('Do', '') or
+            kw in low.get("Don't", '') or
+            kw in low.get('Category', '') or
+            kw in low.get('Flutter Example', '')
+        ):
+            continue
+        if category and category.lower() not in low.get('Category', ''):
+            continue
+        if sev and sev not in low.get('Severity', ''):
+            continue
+        results.append(guidelines[i])
     return results
 
 
+def ranked_search(query: str, limit: int = 10, category: str = None,
+                  severity: str = None) -> list:
+    """The `limit` rows from every knowledge-base table best matching `query`.
+
+    `category` / `severity` keep rows whose Category / Severity column
+    contains them (tables without that column drop out).
+    """
+    cat = category.lower() if category else None
+    sev = severity.lower() if severity else None
+
+    def matches(table, row):
+        return ((cat is None or cat in row.get('Category', '\0').lower()) and
+                (sev is None or sev in row.get('Severity', '\0').lower()))
+    return knowledge_base.load_index().search(query, limit,
+                                              where=matches if cat or sev else None)
+
+
+def print_ranked(hits: list, show_examples: bool = False):
+    if not hits:
+        print(f"{YELLOW}Nothing in the knowledge base matched your query.{RESET}")
+        return
+
+    print(f"\n{BOLD}{'━' * 60}{RESET}")
+    print(f"{BOLD}🎨 Flutter AI UI — Knowledge Base Search Results{RESET}")
+    print(f"{BOLD}{'━' * 60}{RESET}\n")
+
+    for hit in hits:
+        table, row = hit["table"], hit["row"]
+        title = row.get(knowledge_base.TITLE_FIELDS.get(table, ''), '')
+        if table == "guidelines":
+            sev = row.get('Severity', 'LOW')
+            color = SEVERITY_COLOR.get(sev.lower(), RESET)
+            print(f"{hit['score']:>6.2f}  {color}[{sev}]{RESET} {BOLD}{row.get('Category', '')}{RESET} — {title}")
+            print(f"          ✅ DO    : {row.get('Do', '')}")
+            dont = row.get("Don't", '')
+            print(f"          ❌ DON'T : {dont}")
+            if show_examples and row.get('Flutter Example'):
+                print(f"          📝 EXAMPLE: {row.get('Flutter Example', '')}")
+        else:
+            detail = next((row.get(col) for col in ("Description", "Use Case", "Best For", "Notes")
+                           if row.get(col)), '')
+            print(f"{hit['score']:>6.2f}  {CYAN}[{table}]{RESET} {BOLD}{title}{RESET}")
+            if detail:
+                print(f"          {detail}")
+        print()
+
+    print(f"{BOLD}{'━' * 60}{RESET}\n")
+
+
 def print_results(results: list, show_examples: bool = False):
     if not results:
         print(f"{YELLOW}No guidelines matched your query.{RESET}")
@@ -79,7 +158,8 @@ def print_results(results: list, show_examples: bool = False):
         color = SEVERITY_COLOR.get(sev.lower(), RESET)
         print(f"{color}[{sev}]{RESET} {BOLD}{row.get('Category', '')}{RESET} — {row.get('Guideline', '')}")
         print(f"  ✅ DO    : {row.get('Do', '')}")
-        print(f"  ❌ DON'T : {row.get(\"Don't\", '')}")
+        dont = row.get("Don't", '')
+        print(f"  ❌ DON'T : {dont}")
         if show_examples and row.get('Flutter Example'):
             example = row.get('Flutter Example', '')
             print(f"  📝 EXAMPLE: {example}")
@@ -88,32 +168,129 @@ def print_results(results: list, show_examples: bool = False):
     print(f"{BOLD}{'━' * 60}{RESET}\n")
 
 
+def categories(guidelines: list) -> list:
+    """(category, rule count) pairs, sorted by name."""
+    names = sorted(set(row.get('Category', '') for row in guidelines if row.get('Category')))
+    index = getattr(guidelines, "by_category", None)
+    counts = []
+    for cat in names:
+        if index is not None:
+            count = len(index.get(cat.lower(), ()))
+        else:
+            count = sum(1 for r in guidelines if r.get('Category', '').lower() == cat.lower())
+        counts.append((cat, count))
+    return counts
+
+
 def list_categories(guidelines: list):
-    categories = sorted(set(row.get('Category', '') for row in guidelines if row.get('Category')))
     print(f"\n{BOLD}Available categories:{RESET}")
-    for cat in categories:
-        count = sum(1 for r in guidelines if r.get('Category', '').lower() == cat.lower())
+    for cat, count in categories(guidelines):
         print(f"  • {cat} ({count} rules)")
     print()
 
 
+# ─── Query Server ─────────────────────────────────────────────────────────────
+class QueryServer:
+    """Answers JSON-line queries against guidelines loaded once."""
+
+    def __init__(self):
+        self.guidelines = load_guidelines()
+
+    def handle(self, request) -> dict:
+        if not isinstance(request, dict):
+            return {"id": None, "ok": False, "error": "request must be a JSON object"}
+        reply = {"id": request.get("id")}
+        op = request.get("op", "search")
+        if op == "reload":
+            knowledge_base.reset()
+            self.guidelines = load_guidelines()
+        if op in ("search", "categories", "reload") and not CSV_PATH.exists():
+            return dict(reply, ok=False, error=f"guidelines file not found at {CSV_PATH}")
+        if op == "search":
+            filters = {name: request.get(name) for name in ("keyword", "category", "severity")}
+            bad = [name for name, value in filters.items() if value is not None and not isinstance(value, str)]
+            if bad:
+                return dict(reply, ok=False, error=f"{', '.join(bad)} must be a string")
+            results = search(self.guidelines, **filters)
+            return dict(reply, ok=True, count=len(results), results=results)
+        if op == "query":
+            query, limit = request.get("query"), request.get("limit", 10)
+            if not isinstance(query, str):
+                return dict(reply, ok=False, error="query must be a string")
+            if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+                return dict(reply, ok=False, error="limit must be a non-negative integer")
+            filters = {name: request.get(name) for name in ("category", "severity")}
+            if any(value is not None and not isinstance(value, str) for value in filters.values()):
+                return dict(reply, ok=False, error="category and severity must be strings")
+            hits = ranked_search(query, limit, **filters)
+            return dict(reply, ok=True, count=len(hits), results=hits)
+        if op == "categories":
+            return dict(reply, ok=True,
+                        categories=[{"name": cat, "count": n} for cat, n in categories(self.guidelines)])
+        if op == "reload":
+            return dict(reply, ok=True, count=len(self.guidelines))
+        return dict(reply, ok=False, error=f"unknown op {op!r} (expected search, query, categories or reload)")
+
+    def handle_line(self, line: str) -> dict:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {"id": None, "ok": False, "error": f"invalid JSON: {e}"}
+        return self.handle(request)
+
+    def run(self, stream, out=sys.stdout):
+        """Answer every non-blank line of `stream`, flushing after each reply."""
+        for line in stream:
+            if not line.strip():
+                continue
+            out.write(json.dumps(self.handle_line(line), ensure_ascii=False) + "\n")
+            out.flush()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Flutter AI UI — Guidelines Search")
     parser.add_argument("--keyword",  "-k", help="Search keyword (searches across all fields)")
     parser.add_argument("--category", "-c", help="Filter by category (e.g. Accessibility, Theming, Widgets)")
     parser.add_argument("--severity", "-s", help="Filter by severity: critical, high, medium, low")
+    parser.add_argument("--query",    "-q", help="Ranked multi-word search across every knowledge-base CSV")
+    parser.add_argument("--limit",    "-n", type=int, default=10, help="With --query, how many results (default 10)")
     parser.add_argument("--examples", "-e", action="store_true", help="Show Flutter code examples")
     parser.add_argument("--list-categories", "-l", action="store_true", help="List all available categories")
+    parser.add_argument("--serve", action="store_true",
+                        help="Stay resident, answering JSON-line queries on stdin with JSON lines on stdout")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Answer the JSON-line queries in FILE (same protocol as --serve)")
     args = parser.parse_args()
 
+    if args.serve or args.batch:
+        # A missing guidelines CSV is answered per request (see handle()),
+        # so clients always read JSON from stdout.
+        server = QueryServer()
+        if args.serve:
+            try:
+                server.run(sys.stdin)
+            except KeyboardInterrupt:
+                pass
+        else:
+            try:
+                with open(args.batch, encoding='utf-8') as f:
+                    server.run(f)
+            except OSError as e:
+                print(f"{RED}ERROR:{RESET} Cannot read {args.batch}: {e.strerror}", file=sys.stderr)
+                sys.exit(1)
+        sys.exit(0)
+
     guidelines = load_guidelines()
     if not guidelines:
         exit(1)
 
     if args.list_categories:
         list_categories(guidelines)
+    elif args.query:
+        print_ranked(ranked_search(args.query, args.limit, args.category, args.severity),
+                     show_examples=args.examples)
     elif not any([args.keyword, args.category, args.severity]):
-        print(f"{YELLOW}Please provide at least one of: --keyword, --category, --severity{RESET}")
+        print(f"{YELLOW}Please provide at least one of: --query, --keyword, --category, --severity{RESET}")
         parser.print_help()
     else:
         results = search(guidelines, args.keyword, args.category, args.severity)